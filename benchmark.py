@@ -0,0 +1,363 @@
+"""가격표 처리 경로 벤치마크 (Streamlit 서버 없이 실행)
+
+합성 가격표 XLSX를 만들어 수집(스트리밍 파싱, 자료형 변환, 스냅샷), 앱별 검색 경로,
+차트 생성 단계의 실행 시간과 최대 메모리 사용량을 측정하고 결과를 JSON으로 저장합니다.
+
+사용 예:
+    python benchmark.py --rows 10000 100000 --output bench.json
+    python benchmark.py --rows 100000 --baseline bench.json   # 기준보다 느려진 단계가 있으면 종료 코드 1
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pyarrow as pa
+
+import excel_loader
+from current_prices import current_price_rows
+from excel_loader import file_fingerprint, read_excel_streaming, read_snapshot, write_snapshot
+from price_delta import diff_datasets
+from price_store import PriceStore
+from price_schema import apply_price_schema
+from price_staleness import STALE_DAYS_DEFAULT, build_staleness_summary, stale_rows
+from price_trends import build_price_rollups, trend_window
+from result_export import EXPORT_FORMATS, export_bytes
+from result_views import CHART_MODES, build_elapsed_chart, build_price_trend_chart
+from search_engine import (
+    build_code_index, build_date_index, build_fuzzy_index, build_ngram_index, build_search_columns,
+    clear_query_cache, find_rows, find_rows_any_column, find_rows_by_codes, find_rows_by_date, find_rows_fuzzy,
+    normalize_text, update_fuzzy_index, update_ngram_index,
+)
+
+logger = logging.getLogger(__name__)
+
+# 합성 데이터 생성 기본 행 수와 난수 시드
+DEFAULT_ROWS = [10_000, 100_000]
+DEFAULT_SEED = 42
+
+# 생성한 합성 통합문서를 재사용하기 위해 보관하는 디렉터리
+WORKBOOK_DIR = os.path.join(".cache", "benchmarks")
+
+# 기준 결과 대비 이 비율 이상 느려지면 회귀로 판단
+DEFAULT_TOLERANCE = 0.25
+
+# 내보내기 최대 메모리가 완성된 파일 크기보다 이만큼 넘게 크면 실패로 판단
+# (조각 단위로 쓰므로 결과 행 수와 무관해야 함. 전체를 한 번에 변환하면 파일 크기의 몇 배가 됨)
+EXPORT_MAX_OVERHEAD_BYTES = 16 * 1024 * 1024
+
+# 합성 자재명 재료 (한글/영문 품명 + 규격)
+ITEM_NAMES = [
+    "육각볼트", "앵커볼트", "렌치볼트", "와셔", "스프링와셔", "너트", "케이블타이", "전선관", "PVC 파이프",
+    "엘보", "티", "소켓", "Hex Bolt", "Hex Nut", "Flat Washer", "Cable Tie", "Pipe Clamp", "Ball Valve",
+]
+ITEM_SPECS = ["M6", "M8", "M10", "M12", "M16", "15A", "20A", "25A", "SUS304", "SS400", "100mm", "200mm"]
+SUPPLIER_NAMES = [
+    "(주)서울상사", "한국볼트", "대한철강", "ABC Trading", "동양산업", "우리자재", "Global Parts", "미래유통",
+    "(주)부산기계", "신성상사", "Korea Fastener", "제일공구",
+]
+
+# 같은 파일의 새 버전을 흉내 낼 때 가격을 바꾸는 행 비율
+DELTA_CHANGED_RATIO = 0.001
+
+# 검색 경로와 그 경로를 쓰는 앱
+SEARCH_PATHS = {
+    'text_and': ['streamlit_app.py'],
+    'text_or': ['streamlit_app3.py', 'streamlit_app4.py', 'streamlit_app5.py'],
+    'date_range': ['streamlit_app.py'],
+    'date_equal': ['streamlit_app5.py'],
+    'any_column': ['streamlit_app2.py'],
+    'batch_codes': ['streamlit_app.py'],
+    'fuzzy_name': ['streamlit_app.py', 'streamlit_app3.py', 'streamlit_app4.py', 'streamlit_app5.py'],
+}
+
+
+def generate_price_list(rows, seed=DEFAULT_SEED):
+    """자재명/자재코드/공급업체/효력시작일/가격 열을 가진 합성 가격표 DataFrame을 만드는 함수
+
+    자재코드는 행 수의 약 1/4개가 반복되어 나오고, 같은 자재코드는 항상 같은 자재명을
+    가지며, 효력시작일은 최근 5년 안에 고르게 분포합니다.
+    """
+    rng = np.random.default_rng(seed)
+    material_count = max(rows // 4, 1)
+    material_names = np.array([
+        f"{ITEM_NAMES[i % len(ITEM_NAMES)]} {ITEM_SPECS[(i // len(ITEM_NAMES)) % len(ITEM_SPECS)]}"
+        for i in range(material_count)
+    ], dtype=object)
+    material_codes = np.array([f"M{i:06d}" for i in range(material_count)], dtype=object)
+    materials = rng.integers(0, material_count, rows)
+    start = np.datetime64(date.today() - timedelta(days=5 * 365), 'D')
+    return pd.DataFrame({
+        '자재명': material_names[materials],
+        '자재코드': material_codes[materials],
+        '공급업체': np.array(SUPPLIER_NAMES, dtype=object)[rng.integers(0, len(SUPPLIER_NAMES), rows)],
+        '효력시작일': pd.to_datetime(start + rng.integers(0, 5 * 365, rows)),
+        '가격': rng.integers(100, 1_000_000, rows),
+    })
+
+
+def price_update(df, seed=DEFAULT_SEED, ratio=DELTA_CHANGED_RATIO):
+    """가격표의 ``ratio`` 비율 행만 가격을 바꾼 새 버전 DataFrame을 만드는 함수 (공급업체가 다시 보낸 파일)"""
+    rng = np.random.default_rng(seed + 1)
+    changed = rng.choice(len(df), max(int(len(df) * ratio), 1), replace=False)
+    prices = df['가격'].to_numpy().copy()
+    prices[changed] += 1
+    return df.assign(가격=prices)
+
+
+def write_workbook(df, path):
+    """DataFrame을 openpyxl write-only 모드로 XLSX 파일에 쓰는 함수 (행 단위 스트리밍)"""
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("가격표")
+    sheet.append(list(df.columns))
+    for row in df.itertuples(index=False, name=None):
+        sheet.append([value.to_pydatetime() if isinstance(value, pd.Timestamp) else value for value in row])
+    workbook.save(path)
+
+
+def synthetic_workbook(rows, seed=DEFAULT_SEED, directory=WORKBOOK_DIR):
+    """합성 가격표 XLSX 파일 경로를 반환하는 함수 (같은 행 수/시드의 파일이 있으면 재사용)"""
+    path = os.path.join(directory, f"price-list-{rows}-{seed}.xlsx")
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        logger.info("합성 통합문서 생성: %s", path)
+        write_workbook(generate_price_list(rows, seed), path)
+    return path
+
+
+def measure(step, fn, repeat=1):
+    """fn()을 repeat번 실행해 시간(초)을 재고, 한 번 더 실행해 tracemalloc 최대 메모리(바이트)를 재는 함수
+
+    tracemalloc은 실행을 크게 느리게 하므로 시간 측정과 메모리 측정을 따로 합니다.
+    pyarrow 메모리 풀의 할당은 tracemalloc에 잡히지 않으므로 실행 후 할당량을 따로 기록합니다.
+    반환값은 (결과 dict, 마지막 실행의 fn() 반환값)입니다.
+    """
+    seconds = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        seconds.append(time.perf_counter() - started)
+
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    record = {
+        'step': step,
+        'seconds_min': min(seconds),
+        'seconds_median': statistics.median(seconds),
+        'peak_bytes': peak_bytes,
+        'arrow_allocated_bytes': pa.total_allocated_bytes(),
+    }
+    if isinstance(result, np.ndarray):
+        record['result_rows'] = int(len(result))
+    elif isinstance(result, bytes):
+        record['result_bytes'] = len(result)
+    return record, result
+
+
+def benchmark_rows(rows, repeat, seed=DEFAULT_SEED):
+    """행 수 하나에 대해 수집/검색/차트 단계를 모두 측정해 결과 dict 목록을 반환하는 함수"""
+    results = []
+
+    def run(step, fn, times=repeat, apps=None):
+        record, value = measure(step, fn, times)
+        record['rows'] = rows
+        record['apps'] = apps or sorted({app for paths in SEARCH_PATHS.values() for app in paths})
+        results.append(record)
+        logger.info("%8d행 %-24s %9.4f초 %12d바이트", rows, step, record['seconds_min'], record['peak_bytes'])
+        return value
+
+    path = synthetic_workbook(rows, seed)
+    with open(path, "rb") as f:
+        data = f.read()
+    dataset_key = f"benchmark-{file_fingerprint(data)}"
+
+    # 수집: 스트리밍 파싱 -> 자료형 변환 -> 스냅샷 저장/읽기
+    raw = run('ingest_parse', lambda: read_excel_streaming(data), times=1)
+    df = run('ingest_schema', lambda raw=raw: apply_price_schema(raw))
+    del raw
+    snapshot_dir = excel_loader.SNAPSHOT_DIR
+    with tempfile.TemporaryDirectory() as benchmark_snapshot_dir:
+        excel_loader.SNAPSHOT_DIR = benchmark_snapshot_dir
+        try:
+            run('snapshot_write', lambda: write_snapshot(dataset_key, df))
+            run('snapshot_read', lambda: read_snapshot(dataset_key))
+        finally:
+            excel_loader.SNAPSHOT_DIR = snapshot_dir
+
+    # 데이터셋별로 한 번 만드는 검색 색인
+    search_columns = run('index_search_columns', lambda: build_search_columns(df))
+    run('index_date', lambda: build_date_index(df['효력시작일']))
+    ngram_index = run('index_ngram', lambda: build_ngram_index(df), times=1)
+    run('index_code', lambda: build_code_index(search_columns['자재코드']))
+    fuzzy_index = run('index_fuzzy', lambda: build_fuzzy_index(df['자재명']), times=1)
+    run('index_current_prices', lambda: current_price_rows(df, date.today()))
+
+    # 같은 파일의 새 버전: 이전 버전과 행 비교 후 바뀐 행만 색인에 반영
+    updated = price_update(df, seed)
+    delta = run('delta_diff', lambda updated=updated: diff_datasets(df, updated))
+    run('delta_index_ngram', lambda updated=updated, delta=delta: update_ngram_index(ngram_index, updated, delta))
+    run('delta_index_fuzzy', lambda updated=updated, delta=delta: update_fuzzy_index(fuzzy_index, updated['자재명'], delta))
+    del updated, delta
+
+    # 앱별 검색 경로 (색인은 만들어 둔 상태에서 결과 캐시를 비우고 검색만 측정)
+    last_date = df['효력시작일'].max().date()
+    codes = list(df['자재코드'].drop_duplicates().astype(str).iloc[:1000]) + [f"X{i:06d}" for i in range(100)]
+    searches = {
+        'text_and': lambda: find_rows(df, dataset_key, {'자재명': '볼트', '공급업체': '상사'}, match_all=True),
+        'text_or': lambda: find_rows(df, dataset_key, {'자재명': 'm8', '자재코드': 'm8'}, match_all=False),
+        'date_range': lambda: find_rows_by_date(df, dataset_key, last_date - timedelta(days=365), last_date),
+        'date_equal': lambda: find_rows_by_date(df, dataset_key, last_date, last_date),
+        'any_column': lambda: find_rows_any_column(df, dataset_key, 'm8'),
+        'batch_codes': lambda: find_rows_by_codes(df, dataset_key, codes)[0],
+        'fuzzy_name': lambda: find_rows_fuzzy(df, dataset_key, '육깍 볼트 m8')[0],
+    }
+    text_or_rows = None
+    for name, search in searches.items():
+        search()  # 공유 색인(st.cache_resource) 준비
+
+        def uncached(search=search):
+            clear_query_cache()
+            return search()
+
+        rows_found = run(f'search_{name}', uncached, apps=SEARCH_PATHS[name])
+        if name == 'text_or':
+            text_or_rows = rows_found
+
+    # 선택 기능인 SQLite 가격 저장소 (PRICE_STORE_PATH): 저장 한 번과 저장소 색인 조회
+    store_terms = [(col, normalize_text(query)) for col, query in [('공급업체', '상사'), ('자재명', '육각볼트')]]
+    with tempfile.TemporaryDirectory() as store_dir:
+        saved_stores = []
+
+        def save_to_new_store():
+            # 이미 저장된 데이터셋은 다시 저장하지 않으므로 (시간/메모리) 측정마다 새 저장소 파일에 저장
+            store = PriceStore(os.path.join(store_dir, f"prices-{len(saved_stores)}.db"))
+            saved_stores.append(store)
+            store.save_dataset(dataset_key, df, [os.path.basename(path)], search_columns)
+            store.close()
+            return store
+
+        store = run('store_save', save_to_new_store, times=1)
+        run('store_search_text_and', lambda: store.find_rows(dataset_key, store_terms, match_all=True))
+        run('store_date_range', lambda: store.find_rows_by_date(dataset_key, last_date - timedelta(days=365), last_date))
+        run('store_batch_codes', lambda: store.find_rows_by_codes(dataset_key, [normalize_text(c) for c in codes])[0])
+        store.close()
+
+    # 데이터셋 전체 경과일수 집계 (데이터셋/날짜마다 한 번) 와 오래된 가격 조회
+    summary = run('index_staleness', lambda: build_staleness_summary(df, date.today()))
+    run('search_stale_rows', lambda: stale_rows(summary, STALE_DAYS_DEFAULT))
+
+    # 차트 생성 (OR 검색 결과로 표시 방식마다, 경과일수는 데이터셋 집계에서 골라 씀)
+    chart_df = df.iloc[text_or_rows]
+    chart_days = summary['days'][text_or_rows]
+    for mode in CHART_MODES:
+        run(f'chart_{mode}', lambda mode=mode: build_elapsed_chart(chart_df, "벤치마크", mode=mode, days=chart_days))
+
+    # 검색 결과 내보내기 (OR 검색 결과를 형식마다, 데이터셋 전체는 CSV로)
+    for fmt in EXPORT_FORMATS:
+        run(f'export_{fmt.lower()}', lambda fmt=fmt: export_bytes(chart_df, fmt), times=1)
+    run('export_csv_dataset', lambda: export_bytes(df, 'CSV'), times=1)
+
+    # 가격 추이 차트 (streamlit_app2): 집계는 데이터셋마다 한 번, 차트는 전체 기간 일별로
+    rollups = run('index_price_rollups', lambda: build_price_rollups(df, '효력시작일'), apps=['streamlit_app2.py'])
+    run(
+        'chart_price_trend',
+        lambda: build_price_trend_chart(trend_window(rollups['일별'], df['효력시작일'].min(), last_date)[0], "벤치마크"),
+        apps=['streamlit_app2.py'],
+    )
+    return results
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """기준 결과보다 tolerance 비율 이상 느려진 (행 수, 단계) 목록을 반환하는 함수"""
+    previous = {(r['rows'], r['step']): r['seconds_min'] for r in baseline['results']}
+    regressions = []
+    for r in results:
+        before = previous.get((r['rows'], r['step']))
+        if before and r['seconds_min'] > before * (1 + tolerance):
+            regressions.append({'rows': r['rows'], 'step': r['step'], 'before': before, 'after': r['seconds_min']})
+    return regressions
+
+
+def check_export_memory(results, max_overhead=EXPORT_MAX_OVERHEAD_BYTES):
+    """내보내기 단계 중 최대 메모리가 완성된 파일 크기 + max_overhead를 넘은 (행 수, 단계) 목록을 반환하는 함수"""
+    return [
+        {'rows': r['rows'], 'step': r['step'], 'peak_bytes': r['peak_bytes'], 'file_bytes': r['result_bytes']}
+        for r in results
+        if r['step'].startswith('export_') and r['peak_bytes'] > r['result_bytes'] + max_overhead
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="가격표 처리 경로 벤치마크")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS, help="합성 가격표 행 수 (여러 개 가능)")
+    parser.add_argument("--repeat", type=int, default=3, help="단계별 반복 횟수 (최솟값/중앙값 기록)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="합성 데이터 난수 시드")
+    parser.add_argument("--output", help="결과 JSON 파일 경로 (생략하면 표준 출력)")
+    parser.add_argument("--baseline", help="비교할 이전 결과 JSON 파일 경로")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="회귀로 판단할 느려짐 비율")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logging.getLogger("streamlit").setLevel(logging.ERROR)  # 서버 없이 실행할 때의 경고 숨김
+
+    results = []
+    for rows in args.rows:
+        results.extend(benchmark_rows(rows, args.repeat, args.seed))
+    report = {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'pyarrow': pa.__version__,
+            'openpyxl': openpyxl.__version__,
+            'repeat': args.repeat,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+
+    exit_code = 0
+    report['export_memory'] = check_export_memory(results)
+    for r in report['export_memory']:
+        logger.warning(
+            "내보내기 메모리 초과: %d행 %s 최대 %d바이트 (파일 %d바이트)", r['rows'], r['step'], r['peak_bytes'], r['file_bytes'],
+        )
+    if report['export_memory']:
+        exit_code = 1
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            report['regressions'] = compare_with_baseline(results, json.load(f), args.tolerance)
+        for r in report['regressions']:
+            logger.warning("느려짐: %d행 %s %.4f초 -> %.4f초", r['rows'], r['step'], r['before'], r['after'])
+        if report['regressions']:
+            exit_code = 1
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+import logging
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+# 현재 가격을 하나씩 고르는 기준 열과 효력시작일 열
+CURRENT_PRICE_KEY_COLUMNS = ('자재코드', '공급업체')
+CURRENT_PRICE_DATE_COLUMN = '효력시작일'
+
+# 현재 가격 뷰를 보관할 (데이터셋, 기준일) 조합 수
+CURRENT_PRICE_CACHE_MAX_ENTRIES = 16
+
+
+def current_price_rows(df, today, key_columns=CURRENT_PRICE_KEY_COLUMNS, date_column=CURRENT_PRICE_DATE_COLUMN):
+    """(자재코드, 공급업체)마다 현재 적용 중인 가격 행의 위치를 원래 행 순서로 반환하는 함수
+
+    효력시작일이 기준일 이전(기준일 포함)인 행 중 효력시작일이 가장 늦은 행을 고르며,
+    같은 날짜가 여러 행이면 뒤에 있는 행(나중에 읽은 파일/시트)을 고릅니다.
+    효력시작일이 비어 있거나 기준일 이후(효력 예정)인 행은 제외합니다.
+    기준 열의 빈 값도 하나의 값으로 취급합니다.
+    """
+    dates = pd.to_datetime(df[date_column]).to_numpy()
+    eligible = np.flatnonzero(~np.isnat(dates) & (dates <= np.datetime64(today, 'D')))
+
+    # 기준 열들의 값 조합을 정수 그룹 번호 하나로 만듦
+    group = np.zeros(len(eligible), dtype=np.int64)
+    for col in key_columns:
+        codes, uniques = pd.factorize(df[col].iloc[eligible], use_na_sentinel=False)
+        group = group * max(len(uniques), 1) + codes
+
+    # 그룹 -> 효력시작일 -> 행 위치 순으로 정렬해 그룹마다 마지막 행을 고름
+    order = np.lexsort((eligible, dates[eligible], group))
+    group = group[order]
+    last = np.ones(len(order), dtype=bool)
+    last[:-1] = group[1:] != group[:-1]
+    return np.sort(eligible[order[last]])
+
+
+def has_current_price_view(df):
+    """현재 가격 뷰를 만들 수 있는 열(자재코드, 공급업체, 효력시작일)이 모두 있는지 확인하는 함수"""
+    return all(col in df.columns for col in (*CURRENT_PRICE_KEY_COLUMNS, CURRENT_PRICE_DATE_COLUMN))
+
+
+@st.cache_resource(max_entries=CURRENT_PRICE_CACHE_MAX_ENTRIES, show_spinner="현재 가격 목록을 만드는 중...")
+def get_current_price_view(dataset_key, today, _df):
+    """(데이터셋 키, 기준일)별 현재 가격 뷰를 한 번만 만들어 모든 세션이 공유하는 함수
+
+    반환값은 (뷰 DataFrame, 뷰 키)입니다. 뷰는 현재 가격 행만 담은 별도 데이터셋이라
+    검색 색인/결과 캐시도 뷰 키로 따로 만들어지며, 인덱스는 원래 데이터셋의 행 위치를
+    그대로 유지합니다.
+    """
+    rows = current_price_rows(_df, today)
+    logger.info("현재 가격 뷰 생성: %s (기준일 %s, %d / %d행)", dataset_key, today, len(rows), len(_df))
+    return _df.iloc[rows], f"{dataset_key}:current:{today.isoformat()}"
+
+
+def search_target(df, dataset_key, current_only):
+    """검색 대상 (DataFrame, 데이터셋 키)를 반환하는 함수
+
+    ``current_only``가 True이고 필요한 열이 있으면 오늘 기준 현재 가격 뷰를,
+    아니면 전체 데이터셋을 그대로 돌려줍니다.
+    """
+    if current_only and has_current_price_view(df):
+        return get_current_price_view(dataset_key, date.today(), df)
+    return df, dataset_key
@@ -0,0 +1,155 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+logger = logging.getLogger(__name__)
+
+# 모든 세션이 공유하는 데이터셋의 전체 메모리 예산 (환경 변수로 변경 가능)
+REGISTRY_BUDGET_BYTES = int(os.environ.get("PRICE_REGISTRY_BUDGET_MB", "2048")) * 1024 * 1024
+
+# 세션이 이 시간(초) 동안 데이터셋을 사용하지 않으면 참조가 끊긴 것으로 간주 (종료된 브라우저 탭 등)
+HOLDER_IDLE_SECONDS = 60 * 60
+
+
+def current_session_id():
+    """현재 Streamlit 세션 ID를 반환하는 함수 (스크립트 실행 밖에서는 None)"""
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else None
+
+
+class DatasetRegistry:
+    """내용 해시를 키로 불변 데이터셋을 한 벌만 보관하고 세션들이 참조하게 하는 저장소
+
+    세션마다 참조 중인 데이터셋(세션당 하나)을 기록해 두고, 전체 메모리가 예산을
+    넘으면 참조하는 세션이 없는 데이터셋부터 오래 사용되지 않은 순서(LRU)로
+    제거합니다. 세션이 참조 중인 데이터셋은 제거해도 메모리가 줄지 않으므로 남겨 둡니다.
+
+    예산은 등록된 DataFrame 자체의 메모리만 셉니다. 데이터셋별로 따로 만드는 검색 색인
+    (search_engine의 st.cache_resource 캐시와 델타 갱신용 색인)과 경과일수 집계 등은
+    각자의 항목 수 상한으로 관리되며 이 예산에 포함되지 않습니다.
+    """
+
+    def __init__(self, budget_bytes=REGISTRY_BUDGET_BYTES, holder_idle_seconds=HOLDER_IDLE_SECONDS):
+        self.budget_bytes = budget_bytes
+        self.holder_idle_seconds = holder_idle_seconds
+        self._entries = OrderedDict()  # 키 -> {'df', 'nbytes', 'holders': {세션 ID: 마지막 사용 시각}}
+        self._session_keys = {}  # 세션 ID -> 참조 중인 데이터셋 키
+        self._lineages = {}  # 계보(같은 파일 이름 목록) -> 가장 최근에 등록된 데이터셋 키
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def _hold(self, key, session_id):
+        """세션이 데이터셋을 참조하도록 기록하고 이전에 참조하던 데이터셋은 놓는 함수 (잠금 안에서 호출)"""
+        if session_id is None:
+            return
+        previous_key = self._session_keys.get(session_id)
+        if previous_key is not None and previous_key != key and previous_key in self._entries:
+            self._entries[previous_key]['holders'].pop(session_id, None)
+        self._session_keys[session_id] = key
+        self._entries[key]['holders'][session_id] = time.monotonic()
+
+    def _live_holders(self, entry, now):
+        """오래 사용되지 않은 세션 참조를 정리하고 남은 참조 수를 반환하는 함수 (잠금 안에서 호출)"""
+        holders = entry['holders']
+        for session_id, last_seen in list(holders.items()):
+            if now - last_seen > self.holder_idle_seconds:
+                del holders[session_id]
+                self._session_keys.pop(session_id, None)
+        return len(holders)
+
+    def _evict(self):
+        """예산을 넘으면 참조 없는 데이터셋을 LRU 순서로 제거하는 함수 (잠금 안에서 호출)"""
+        now = time.monotonic()
+        for key in list(self._entries):
+            if self._total_bytes <= self.budget_bytes:
+                return
+            entry = self._entries[key]
+            if self._live_holders(entry, now) == 0:
+                del self._entries[key]
+                self._total_bytes -= entry['nbytes']
+                logger.info("데이터셋 레지스트리에서 제거: %s (%d바이트)", key, entry['nbytes'])
+        if self._total_bytes > self.budget_bytes:
+            logger.warning(
+                "데이터셋 메모리가 예산을 넘었지만 모두 세션이 참조 중입니다: %d / %d바이트",
+                self._total_bytes, self.budget_bytes,
+            )
+
+    def get(self, key, session_id=None):
+        """데이터셋을 찾아 세션 참조를 기록하고 반환하는 함수 (없으면 None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self._hold(key, session_id)
+            return entry['df']
+
+    def put(self, key, df, session_id=None, lineage=None):
+        """새 데이터셋을 등록하고 세션 참조를 기록하는 함수
+
+        같은 키가 이미 있으면(다른 세션이 동시에 먼저 등록한 경우) 기존 데이터셋을
+        유지하고 그것을 반환합니다. ``lineage``(같은 파일의 새 버전끼리 같은 값)를 주면
+        그 계보의 최신 데이터셋으로 기록합니다. 참조하는 세션이 없고(``session_id``가
+        None) 예산을 넘으면 등록 직후 제거될 수 있지만, 반환한 DataFrame은 그대로 쓸 수 있습니다.
+        """
+        nbytes = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = {'df': df, 'nbytes': nbytes, 'holders': {}}
+                self._total_bytes += nbytes
+            if lineage is not None:
+                self._lineages[lineage] = key
+            entry = self._entries[key]
+            self._entries.move_to_end(key)
+            self._hold(key, session_id)
+            self._evict()
+            return entry['df']
+
+    def latest(self, lineage):
+        """계보의 가장 최근 데이터셋을 (키, DataFrame)으로 반환하는 함수 (없거나 제거되었으면 None)"""
+        with self._lock:
+            key = self._lineages.get(lineage)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._lineages.pop(lineage, None)
+                return None
+            return key, entry['df']
+
+    def release(self, session_id):
+        """세션이 참조하던 데이터셋을 놓는 함수 (업로드 파일을 지웠을 때 등)"""
+        with self._lock:
+            key = self._session_keys.pop(session_id, None)
+            if key is not None and key in self._entries:
+                self._entries[key]['holders'].pop(session_id, None)
+            self._evict()
+
+    def stats(self):
+        """등록된 데이터셋 수, 전체 바이트 수, 예산, 데이터셋별 참조 세션 수를 반환하는 함수"""
+        with self._lock:
+            now = time.monotonic()
+            return {
+                'datasets': len(self._entries),
+                'bytes': self._total_bytes,
+                'budget_bytes': self.budget_bytes,
+                'holders': {key: self._live_holders(entry, now) for key, entry in self._entries.items()},
+            }
+
+
+# 프로세스 전체(모든 세션)가 공유하는 레지스트리
+_registry = DatasetRegistry()
+
+
+def get_registry():
+    """프로세스 전체가 공유하는 데이터셋 레지스트리를 반환하는 함수"""
+    return _registry
+
+
+def release_session_dataset():
+    """현재 세션이 참조하던 데이터셋을 레지스트리에서 놓는 함수"""
+    session_id = current_session_id()
+    if session_id is not None:
+        _registry.release(session_id)
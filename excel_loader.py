@@ -0,0 +1,576 @@
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import openpyxl
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as pa_feather
+import streamlit as st
+
+from dataset_registry import current_session_id, get_registry
+from price_delta import compute_dataset_delta
+from price_schema import apply_price_schema
+from price_store import get_price_store
+from search_engine import carry_over_query_cache, get_search_columns
+
+# 'openpyxl' 라이브러리가 설치되어 있어야 XLSX 파일을 읽을 수 있습니다.
+# 'pyarrow' 라이브러리는 컬럼 스냅샷(Arrow IPC/Feather) 저장에 사용됩니다.
+
+logger = logging.getLogger(__name__)
+
+# 컬럼 스냅샷 저장 디렉터리 (서버 재시작 후에도 유지되며, 환경 변수로 변경 가능)
+SNAPSHOT_DIR = os.environ.get("PRICE_SNAPSHOT_DIR", os.path.join(".cache", "snapshots"))
+# 스냅샷 형식 버전 (저장하는 DataFrame의 자료형 규칙이 바뀌면 올려서 이전 스냅샷을 무시)
+SNAPSHOT_VERSION = 2
+# 디렉터리에 보관할 최대 스냅샷 수 (초과하면 가장 오래 사용되지 않은 파일부터 삭제)
+SNAPSHOT_MAX_FILES = 64
+
+# 스트리밍 파싱 시 한 번에 DataFrame으로 변환할 행 수
+STREAM_CHUNK_ROWS = 50_000
+# 스트리밍 파싱 중 진행률 보고/취소 확인 간격 (행 수)
+PROGRESS_EVERY_ROWS = 5_000
+
+# 여러 시트를 병렬로 파싱할 프로세스 수 (환경 변수로 변경 가능)
+INGEST_MAX_WORKERS = int(os.environ.get("PRICE_INGEST_WORKERS", os.cpu_count() or 1))
+
+# 여러 파일/시트를 합칠 때 추가하는 출처 열 이름
+SOURCE_FILE_COLUMN = "원본파일"
+SOURCE_SHEET_COLUMN = "원본시트"
+
+# 백그라운드 파일 읽기 스레드 수와 진행률 확인 주기(초)
+INGEST_BACKGROUND_WORKERS = int(os.environ.get("PRICE_INGEST_BACKGROUND_WORKERS", "2"))
+INGEST_POLL_SECONDS = 0.5
+
+# 백그라운드 파일 읽기 상태를 보관하는 세션 상태 키
+# (진행 중인 작업 / 사용 가능한 최신 데이터셋 / 취소되거나 실패한 작업)
+INGEST_JOB_KEY = "_ingest_job"
+INGEST_READY_KEY = "_ingest_ready"
+INGEST_STOPPED_KEY = "_ingest_stopped"
+
+# 가격 저장소(SQLite)에 데이터셋을 저장하는 스레드 (저장은 한 번에 하나씩, 화면 표시는 기다리지 않음)
+_store_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="price-store")
+
+# 시트 파싱용 프로세스 풀 (처음 필요할 때 만들고 재실행 간에 재사용)
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+# 백그라운드 파일 읽기용 스레드 풀 (모든 세션이 공유)
+_ingest_executor = ThreadPoolExecutor(max_workers=INGEST_BACKGROUND_WORKERS, thread_name_prefix="ingest")
+
+
+class IngestCancelled(Exception):
+    """파일 읽기가 사용자 요청으로 취소되었을 때 발생하는 예외"""
+
+
+def _check_cancelled(cancel_event):
+    """취소 요청이 있으면 IngestCancelled를 발생시키는 함수"""
+    if cancel_event is not None and cancel_event.is_set():
+        raise IngestCancelled()
+
+
+def file_fingerprint(data):
+    """파일 내용(bytes)의 해시값을 계산하는 함수 (데이터셋 식별자로 사용)"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def snapshot_path(fingerprint):
+    """데이터셋 해시에 대응하는 스냅샷 파일 경로를 반환하는 함수"""
+    return os.path.join(SNAPSHOT_DIR, f"{fingerprint}-v{SNAPSHOT_VERSION}.arrow")
+
+
+def read_snapshot(fingerprint):
+    """저장된 컬럼 스냅샷을 메모리 매핑으로 읽는 함수 (스냅샷이 없으면 None)
+
+    압축하지 않은 Arrow IPC 파일을 매핑하므로 파일 전체를 읽어 들이지 않고,
+    숫자/문자열 버퍼는 가능한 한 복사 없이 DataFrame으로 변환됩니다.
+    """
+    path = snapshot_path(fingerprint)
+    if not os.path.exists(path):
+        return None
+    try:
+        table = pa_feather.read_table(path, memory_map=True)
+        os.utime(path)  # 최근 사용 시각 갱신 (정리 시 LRU 기준)
+        return table.to_pandas(split_blocks=True)
+    except (pa.ArrowException, OSError) as e:
+        logger.warning("스냅샷을 읽지 못했습니다 (%s): %s", path, e)
+        return None
+
+
+def write_snapshot(fingerprint, df):
+    """DataFrame을 컬럼 스냅샷으로 저장하는 함수 (실패해도 앱 동작에는 영향 없음)"""
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=SNAPSHOT_DIR, suffix=".tmp")
+    os.close(fd)
+    try:
+        # 메모리 매핑으로 바로 읽을 수 있도록 압축 없이 저장
+        pa_feather.write_feather(df, tmp_path, compression="uncompressed")
+        os.replace(tmp_path, snapshot_path(fingerprint))
+    except (pa.ArrowException, ValueError, TypeError, OSError) as e:
+        logger.warning("스냅샷 저장에 실패했습니다 (%s): %s", fingerprint, e)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return
+    prune_snapshots()
+
+
+def prune_snapshots(max_files=SNAPSHOT_MAX_FILES):
+    """스냅샷 수가 상한을 넘으면 가장 오래 사용되지 않은 파일부터 삭제하는 함수"""
+    paths = [
+        os.path.join(SNAPSHOT_DIR, name)
+        for name in os.listdir(SNAPSHOT_DIR)
+        if name.endswith(".arrow")
+    ]
+    if len(paths) <= max_files:
+        return
+    paths.sort(key=os.path.getmtime)
+    for path in paths[:len(paths) - max_files]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _header_names(header):
+    """첫 행을 열 이름으로 변환하는 함수 (pd.read_excel과 같은 규칙)"""
+    names = []
+    seen = {}
+    for i, value in enumerate(header):
+        name = f"Unnamed: {i}" if value is None else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def read_excel_streaming(data, sheet_name=None, chunk_rows=STREAM_CHUNK_ROWS, on_progress=None, cancel_event=None):
+    """XLSX를 청크 단위로 읽어 DataFrame을 만드는 함수
+
+    openpyxl 읽기 전용 모드로 행을 순회하면서 ``chunk_rows``개마다 타입이 지정된
+    DataFrame 조각으로 변환하므로, 파이썬 객체로 된 행 목록은 한 청크 분량만
+    메모리에 남습니다. ``on_progress(읽은 행 수, 전체 행 수 추정치 또는 None)``가
+    PROGRESS_EVERY_ROWS행마다 호출됩니다. ``cancel_event``(threading.Event)가 설정되면 같은 간격으로 확인해
+    IngestCancelled를 발생시킵니다.
+    """
+    workbook = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        sheet = workbook[sheet_name] if sheet_name is not None else workbook.worksheets[0]
+        total_rows = max((sheet.max_row or 1) - 1, 0)  # 머리글 행 제외 (추정치)
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return pd.DataFrame()
+        columns = _header_names(header)
+        width = len(columns)
+
+        chunks = []
+        buffer = []
+        rows_read = 0
+        for row in rows:
+            if len(row) != width:
+                row = (tuple(row) + (None,) * width)[:width]
+            buffer.append(row)
+            if len(buffer) >= chunk_rows:
+                chunks.append(pd.DataFrame.from_records(buffer, columns=columns))
+                rows_read += len(buffer)
+                buffer = []
+            if len(buffer) % PROGRESS_EVERY_ROWS == 0:
+                _check_cancelled(cancel_event)
+                if on_progress:
+                    done = rows_read + len(buffer)
+                    # 시트에 크기 정보가 없거나 틀리면 전체 행 수를 모르는 것으로 보고
+                    on_progress(done, total_rows if total_rows >= done else None)
+        if buffer:
+            chunks.append(pd.DataFrame.from_records(buffer, columns=columns))
+            rows_read += len(buffer)
+        if on_progress:
+            on_progress(rows_read, rows_read)
+    finally:
+        workbook.close()
+
+    if not chunks:
+        return pd.DataFrame(columns=columns)
+    df = pd.concat(chunks, ignore_index=True)
+    # pd.read_excel과 마찬가지로 끝부분의 빈 행은 제거
+    non_empty = df.notna().any(axis=1).to_numpy().nonzero()[0]
+    last_row = non_empty[-1] + 1 if len(non_empty) else 0
+    return df.iloc[:last_row] if last_row < len(df) else df
+
+
+def list_sheet_names(data):
+    """XLSX 파일의 시트 이름 목록을 반환하는 함수"""
+    workbook = openpyxl.load_workbook(io.BytesIO(data), read_only=True)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+
+def _parse_sheet_task(data, sheet_name):
+    """프로세스 풀에서 시트 하나를 파싱하는 작업 함수 (피클링 가능한 최상위 함수)"""
+    return read_excel_streaming(data, sheet_name=sheet_name)
+
+
+def _get_process_pool():
+    """시트 파싱용 프로세스 풀을 반환하는 함수 (스레드가 많은 서버 프로세스이므로 spawn 사용)"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=INGEST_MAX_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _process_pool
+
+
+def _reset_process_pool():
+    """비정상 종료된 프로세스 풀을 버려 다음 호출 때 새로 만들도록 하는 함수"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+def parse_sheets(tasks, on_progress=None, cancel_event=None):
+    """(파일 내용, 시트 이름) 작업 목록을 파싱해 같은 순서의 DataFrame 목록을 반환하는 함수
+
+    작업이 둘 이상이고 CPU가 여러 개이면 프로세스 풀에서 동시에 파싱하고,
+    작업이 하나뿐이면 현재 프로세스에서 청크 단위 진행률을 보고하며 파싱합니다.
+    ``on_progress(완료 수, 전체 수)``는 작업 단위(단일 작업이면 행 단위)로 호출됩니다.
+    ``cancel_event``가 설정되면 아직 시작하지 않은 작업을 취소하고 IngestCancelled를
+    발생시킵니다 (이미 다른 프로세스에서 실행 중인 시트는 끝날 때까지 실행됨).
+    """
+    if len(tasks) == 1 or INGEST_MAX_WORKERS <= 1:
+        frames = []
+        for i, (data, sheet_name) in enumerate(tasks):
+            if len(tasks) == 1:
+                frames.append(read_excel_streaming(
+                    data, sheet_name=sheet_name, on_progress=on_progress, cancel_event=cancel_event
+                ))
+            else:
+                frames.append(read_excel_streaming(data, sheet_name=sheet_name, cancel_event=cancel_event))
+                if on_progress:
+                    on_progress(i + 1, len(tasks))
+        return frames
+
+    frames = [None] * len(tasks)
+    try:
+        pool = _get_process_pool()
+        futures = {pool.submit(_parse_sheet_task, data, sheet_name): i for i, (data, sheet_name) in enumerate(tasks)}
+        pending = set(futures)
+        while pending:
+            # 취소 요청을 확인할 수 있도록 짧은 간격으로 완료된 작업을 모음
+            done, pending = wait(pending, timeout=INGEST_POLL_SECONDS, return_when=FIRST_COMPLETED)
+            for future in done:
+                frames[futures[future]] = future.result()
+            if cancel_event is not None and cancel_event.is_set():
+                for future in pending:
+                    future.cancel()
+                raise IngestCancelled()
+            if done and on_progress:
+                on_progress(len(futures) - len(pending), len(tasks))
+    except BrokenProcessPool:
+        logger.warning("프로세스 풀이 비정상 종료되어 현재 프로세스에서 순차 파싱합니다.")
+        _reset_process_pool()
+        for i, (data, sheet_name) in enumerate(tasks):
+            if frames[i] is None:
+                frames[i] = read_excel_streaming(data, sheet_name=sheet_name, cancel_event=cancel_event)
+    return frames
+
+
+def combine_sheet_frames(parts):
+    """(파일 이름, 시트 이름, DataFrame) 목록을 하나의 데이터셋으로 합치는 함수
+
+    출처가 둘 이상이면 각 행에 원본 파일/시트 열을 붙여서 합치고,
+    파일 하나에 시트 하나뿐이면 원래 DataFrame을 그대로 돌려줍니다.
+    """
+    parts = [(name, sheet, df) for name, sheet, df in parts if not df.empty]
+    if not parts:
+        return pd.DataFrame()
+    if len(parts) == 1:
+        return parts[0][2]
+    frames = [
+        df.assign(**{SOURCE_FILE_COLUMN: name, SOURCE_SHEET_COLUMN: sheet})
+        for name, sheet, df in parts
+    ]
+    return pd.concat(frames, ignore_index=True)
+
+
+def _progress_state(label, done, total, unit):
+    """진행률 표시줄에 넘길 (비율, 문구)를 만드는 함수 (전체 수를 모르면 읽은 수만 표시)"""
+    if not total:
+        return 0.0, f"'{label}' 읽는 중... {done:,} {unit}" if done else f"'{label}' 읽는 중..."
+    return min(done / total, 1.0), f"'{label}' 읽는 중... {done:,} / {total:,} {unit}"
+
+
+def workbooks_fingerprint(files):
+    """(파일 이름, 내용) 목록의 데이터셋 키를 계산하는 함수
+
+    업로드 순서대로 이어 붙인 파일 해시들의 해시이며, 파일이 하나면 그 파일의 해시입니다.
+    """
+    fingerprints = [file_fingerprint(data) for _, data in files]
+    if len(fingerprints) == 1:
+        return fingerprints[0]
+    return file_fingerprint("|".join(fingerprints).encode())
+
+
+def dataset_lineage(files):
+    """(파일 이름, 내용) 목록의 계보를 반환하는 함수
+
+    파일 이름 목록이 같으면 내용이 바뀌어도 같은 계보(같은 파일의 새 버전)로 봅니다.
+    """
+    return tuple(sorted(name for name, _ in files))
+
+
+def ingest_workbooks(files, fingerprint, session_id=None, on_progress=None, cancel_event=None):
+    """(파일 이름, 내용) 목록의 모든 시트를 읽어 레지스트리에 등록하고 DataFrame을 반환하는 함수
+
+    컬럼 스냅샷이 있으면 그것을 쓰고, 없으면 모든 시트를 병렬 파싱하고 자료형을
+    정리한 뒤 스냅샷으로 저장합니다. Streamlit 명령을 쓰지 않으므로 백그라운드
+    스레드에서도 실행할 수 있으며, 세션 ID는 호출한 쪽에서 넘겨야 합니다.
+    ``on_progress(완료 수, 전체 수, 단위)``로 진행률을 보고합니다.
+
+    같은 파일 이름의 이전 버전이 레지스트리에 있으면 (자재코드, 공급업체, 효력시작일) 키로
+    두 버전을 비교해 델타를 등록하고, 이전 버전의 검색 결과 캐시를 델타로 갱신해 옮깁니다.
+    검색 색인은 처음 필요할 때 이전 버전 색인에 델타만 적용해 만들어집니다.
+    가격 저장소를 쓰는 경우 데이터셋을 백그라운드에서 저장소에도 저장합니다.
+    """
+    df = read_snapshot(fingerprint)
+    if df is not None:
+        logger.info("컬럼 스냅샷에서 로드: %s", fingerprint)
+    else:
+        logger.info("XLSX 파싱 (캐시 미스): %s", fingerprint)
+        sources = [(name, sheet, data) for name, data in files for sheet in list_sheet_names(data)]
+        unit = "행" if len(sources) == 1 else "시트"
+        frames = parse_sheets(
+            [(data, sheet) for _, sheet, data in sources],
+            on_progress=(lambda done, total: on_progress(done, total, unit)) if on_progress else None,
+            cancel_event=cancel_event,
+        )
+        _check_cancelled(cancel_event)
+        df = combine_sheet_frames(
+            [(name, sheet, frame) for (name, sheet, _), frame in zip(sources, frames)]
+        )
+        # 날짜 파싱/범주형 변환/숫자 다운캐스트는 수집 시 한 번만 수행 (스냅샷에도 그대로 저장)
+        df = apply_price_schema(df)
+        write_snapshot(fingerprint, df)
+    _check_cancelled(cancel_event)
+    registry = get_registry()
+    lineage = dataset_lineage(files)
+    previous = registry.latest(lineage)
+    df = registry.put(fingerprint, df, session_id, lineage=lineage)
+    if previous is not None and previous[0] != fingerprint:
+        delta = compute_dataset_delta(previous[0], previous[1], fingerprint, df)
+        if delta is not None:
+            carry_over_query_cache(delta, df)
+    store_dataset_in_background(fingerprint, df, [name for name, _ in files])
+    return df
+
+
+def _save_to_store(dataset_key, df, names):
+    """데이터셋과 정규화 검색 열을 가격 저장소에 저장하는 함수 (저장 스레드에서 실행)"""
+    try:
+        get_price_store().save_dataset(dataset_key, df, names, get_search_columns(dataset_key, df))
+    except Exception:
+        logger.exception("가격 저장소 저장 실패: %s", dataset_key)
+
+
+def store_dataset_in_background(dataset_key, df, names):
+    """가격 저장소를 쓰는 경우 데이터셋을 백그라운드에서 저장하는 함수 (이미 저장된 데이터셋은 건너뜀)
+
+    저장을 마치기 전까지 검색은 메모리에서 처리되고, 마친 뒤부터 저장소 색인을 씁니다.
+    """
+    store = get_price_store()
+    if store is None or store.has_dataset(dataset_key):
+        return
+    _store_executor.submit(_save_to_store, dataset_key, df, names)
+
+
+def select_stored_dataset():
+    """가격 저장소에 저장된 데이터셋을 고르는 선택 상자를 표시하고 고른 데이터셋 키를 반환하는 함수
+
+    저장소를 쓰지 않거나 저장된 데이터셋이 없으면 아무것도 표시하지 않고 None을 반환합니다.
+    파일을 올리지 않았을 때 호출하므로, 서버를 다시 시작해도 파일을 다시 올리지 않고 조회할 수 있습니다.
+    """
+    store = get_price_store()
+    datasets = store.list_datasets() if store is not None else []
+    if not datasets:
+        return None
+    labels = {
+        d['dataset_key']: f"{', '.join(d['names'])} ({d['row_count']:,}행, {d['stored_at'].replace('T', ' ')[:16]} 저장)"
+        for d in datasets
+    }
+    return st.selectbox(
+        "또는 저장된 가격표 불러오기", [None, *labels],
+        format_func=lambda key: "(선택 안 함)" if key is None else labels[key], key="stored_dataset",
+    )
+
+
+def load_stored_dataset(dataset_key):
+    """가격 저장소에 저장된 데이터셋을 (데이터셋 키, DataFrame, 파일 이름 목록)으로 반환하는 함수
+
+    레지스트리 -> 컬럼 스냅샷 -> 저장소 테이블 순서로 찾고, 레지스트리에 없었으면 등록합니다.
+    저장소에서 지워졌으면 안내를 표시하고 (None, None, None)을 반환합니다.
+    """
+    store = get_price_store()
+    names = next((d['names'] for d in store.list_datasets() if d['dataset_key'] == dataset_key), None)
+    if names is None:
+        st.warning("선택한 가격표가 저장소에서 삭제되었습니다. 파일을 다시 올려주세요.")
+        return None, None, None
+    session_id = current_session_id()
+    registry = get_registry()
+    df = registry.get(dataset_key, session_id)
+    if df is None:
+        df = read_snapshot(dataset_key)
+        if df is None:
+            with st.spinner("저장된 가격표를 불러오는 중..."):
+                df = store.load_dataset(dataset_key)
+        if df is None:
+            return None, None, None
+        df = registry.put(dataset_key, df, session_id, lineage=tuple(sorted(names)))
+    return dataset_key, df.copy(deep=False), names
+
+
+def _finish_ingest_job(job):
+    """끝난 백그라운드 작업의 결과를 세션 상태에 반영하는 함수
+
+    성공하면 새 데이터셋을 한 번의 대입으로 '사용 가능한 데이터셋'으로 바꾸고,
+    취소/실패하면 같은 파일로 다시 시작하지 않도록 기록해 둡니다.
+    """
+    st.session_state.pop(INGEST_JOB_KEY, None)
+    try:
+        df = job['future'].result()
+    except IngestCancelled:
+        logger.info("파일 읽기 취소: %s", job['fingerprint'])
+        st.session_state[INGEST_STOPPED_KEY] = {'fingerprint': job['fingerprint'], 'error': None}
+        return
+    except Exception as e:
+        logger.exception("파일 읽기 실패: %s", job['fingerprint'])
+        st.session_state[INGEST_STOPPED_KEY] = {'fingerprint': job['fingerprint'], 'error': e}
+        return
+    st.session_state[INGEST_READY_KEY] = {
+        'fingerprint': job['fingerprint'],
+        'names': job['names'],
+        'df': df,
+    }
+
+
+@st.fragment(run_every=INGEST_POLL_SECONDS)
+def _ingest_progress_panel():
+    """백그라운드 파일 읽기 진행률과 취소 버튼을 표시하는 fragment (주기적으로 다시 실행)
+
+    작업이 끝나면 앱 전체를 다시 실행해 새 데이터셋으로 전환합니다.
+    """
+    job = st.session_state.get(INGEST_JOB_KEY)
+    if job is None:
+        return
+    if job['future'].done():
+        _finish_ingest_job(job)
+        st.rerun()
+
+    label = ", ".join(job['names'])
+    progress = job['progress']
+    if job['cancel'].is_set():
+        st.info(f"'{label}' 읽기를 취소하는 중...")
+        return
+    ratio, text = _progress_state(label, progress['done'], progress['total'], progress['unit'])
+    st.progress(ratio, text=text)
+    if st.button("읽기 취소", key="ingest_cancel"):
+        job['cancel'].set()
+
+
+def load_uploaded_workbooks_in_background(uploaded_files, progress_container=None):
+    """업로드된 파일을 백그라운드 스레드에서 읽고, 지금 사용할 수 있는 데이터셋을 반환하는 함수
+
+    반환값은 (데이터셋 키, DataFrame, 파일 이름 목록)이며, 새 파일을 읽는 동안에는 이전에
+    읽어 둔 데이터셋을 (없으면 (None, None, None)을) 돌려주므로 사용자는 계속 조회할 수
+    있습니다. 진행률과 취소 버튼은 ``progress_container``(기본: 본문)에 표시되고,
+    읽기가 끝나면 앱을 다시 실행해 새 데이터셋으로 한 번에 전환합니다.
+    레지스트리에 이미 있는 파일(다른 세션이 읽은 파일 등)은 기다리지 않고 바로 사용합니다.
+    읽기에 실패하면 그 예외를 다시 발생시킵니다.
+    """
+    files = [(f.name, f.getvalue()) for f in uploaded_files]
+    fingerprint = workbooks_fingerprint(files)
+    names = [name for name, _ in files]
+    session_id = current_session_id()
+    registry = get_registry()
+
+    job = st.session_state.get(INGEST_JOB_KEY)
+    if job is not None and job['future'].done():
+        _finish_ingest_job(job)
+        job = None
+
+    ready = st.session_state.get(INGEST_READY_KEY)
+    if ready is None or ready['fingerprint'] != fingerprint:
+        df = registry.get(fingerprint, session_id)
+        if df is not None:
+            if job is not None:
+                job['cancel'].set()
+                st.session_state.pop(INGEST_JOB_KEY, None)
+                job = None
+            ready = {'fingerprint': fingerprint, 'names': names, 'df': df}
+            st.session_state[INGEST_READY_KEY] = ready
+    elif registry.get(fingerprint, session_id) is None:
+        # 예산 초과로 레지스트리에서 빠졌으면 세션이 가진 데이터셋을 다시 등록
+        registry.put(fingerprint, ready['df'], session_id)
+
+    stopped = st.session_state.get(INGEST_STOPPED_KEY)
+    if ready is not None and ready['fingerprint'] == fingerprint:
+        if job is not None:
+            job['cancel'].set()
+            st.session_state.pop(INGEST_JOB_KEY, None)
+    elif stopped is not None and stopped['fingerprint'] == fingerprint:
+        if stopped['error'] is not None:
+            raise stopped['error']
+        container = progress_container if progress_container is not None else st
+        container.info(f"'{', '.join(names)}' 읽기를 취소했습니다. 다시 읽으려면 파일을 다시 올려주세요.")
+    else:
+        if job is not None and job['fingerprint'] != fingerprint:
+            job['cancel'].set()
+            job = None
+        if job is None:
+            progress = {'done': 0, 'total': None, 'unit': '행'}
+
+            def on_progress(done, total, unit):
+                progress.update(done=done, total=total, unit=unit)
+
+            cancel = threading.Event()
+            job = {
+                'fingerprint': fingerprint,
+                'names': names,
+                'progress': progress,
+                'cancel': cancel,
+                'future': _ingest_executor.submit(
+                    ingest_workbooks, files, fingerprint, session_id, on_progress, cancel
+                ),
+            }
+            st.session_state[INGEST_JOB_KEY] = job
+            st.session_state.pop(INGEST_STOPPED_KEY, None)
+        if progress_container is not None:
+            with progress_container:
+                _ingest_progress_panel()
+        else:
+            _ingest_progress_panel()
+
+    if ready is None:
+        return None, None, None
+    return ready['fingerprint'], ready['df'].copy(deep=False), ready['names']
+
+
+def clear_background_ingest():
+    """진행 중인 백그라운드 읽기를 취소하고 세션의 데이터셋 상태를 지우는 함수 (업로드 파일을 지웠을 때)"""
+    job = st.session_state.pop(INGEST_JOB_KEY, None)
+    if job is not None:
+        job['cancel'].set()
+    st.session_state.pop(INGEST_READY_KEY, None)
+    st.session_state.pop(INGEST_STOPPED_KEY, None)
@@ -0,0 +1,169 @@
+import functools
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from dataset_registry import get_registry
+from search_engine import query_cache_stats
+
+logger = logging.getLogger(__name__)
+
+# 이 환경 변수가 설정되면 모든 세션에서 구간 시간을 로그로 남김 (예: PRICE_APP_INSTRUMENTATION=1)
+INSTRUMENTATION_ENV = "PRICE_APP_INSTRUMENTATION"
+
+# 세션별로 측정을 켜는 사이드바 체크박스 키
+DEBUG_PANEL_KEY = "instrumentation_enabled"
+
+# 최근 실행(전체 재실행과 fragment 부분 실행)별 구간 기록을 보관하는 세션 상태 키
+SPANS_KEY = "_instrumentation_spans"
+
+# 디버그 패널에 보여 줄 최근 실행 수
+DEBUG_PANEL_RUNS = 10
+
+# 디버그 패널을 다시 그리는 주기(초): 섹션만 다시 실행된 fragment 실행의 구간도 곧 패널에 나타남
+DEBUG_PANEL_REFRESH_SECONDS = 2
+
+# 측정을 끈 경우 span()이 돌려주는 빈 컨텍스트 (호출 비용 외에는 아무것도 하지 않음)
+_DISABLED = nullcontext()
+
+
+def _rss_bytes():
+    """현재 프로세스의 상주 메모리(RSS) 바이트 수를 반환하는 함수 (/proc가 없으면 None)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def instrumentation_enabled():
+    """환경 변수 또는 현재 세션의 디버그 패널 체크박스로 측정이 켜져 있는지 확인하는 함수"""
+    if os.environ.get(INSTRUMENTATION_ENV):
+        return True
+    return get_script_run_ctx() is not None and st.session_state.get(DEBUG_PANEL_KEY, False)
+
+
+def _begin_run(label):
+    """새 실행의 구간 기록을 시작하는 함수 (최근 DEBUG_PANEL_RUNS개 실행만 보관)"""
+    runs = st.session_state.setdefault(SPANS_KEY, [])
+    runs.append({'run': label, 'spans': []})
+    del runs[:-DEBUG_PANEL_RUNS]
+
+
+def begin_rerun():
+    """재실행 시작 시 호출해 이번 전체 재실행의 구간 기록을 시작하는 함수"""
+    if SPANS_KEY in st.session_state or instrumentation_enabled():
+        _begin_run("전체 재실행")
+
+
+def measured_fragment(func):
+    """st.fragment와 같되, 그 섹션만 다시 실행될 때 구간을 별도 실행으로 기록하는 데코레이터
+
+    fragment만 다시 실행될 때는 begin_rerun()이 호출되지 않으므로, 이 데코레이터가
+    'fragment: 함수 이름' 실행 기록을 시작합니다. 전체 재실행 중의 호출은 그 재실행에
+    함께 기록합니다.
+    """
+    @functools.wraps(func)
+    def run_fragment(*args, **kwargs):
+        ctx = get_script_run_ctx()
+        if ctx is not None and ctx.fragment_ids_this_run and (SPANS_KEY in st.session_state or instrumentation_enabled()):
+            _begin_run(f"fragment: {func.__name__}")
+        return func(*args, **kwargs)
+
+    return st.fragment(run_fragment)
+
+
+@contextmanager
+def _timed_span(name, fields):
+    """span()이 측정을 켠 경우 사용하는 실제 측정 컨텍스트"""
+    spans = None
+    if get_script_run_ctx() is not None:
+        runs = st.session_state.get(SPANS_KEY)
+        if not runs:
+            _begin_run("전체 재실행")
+            runs = st.session_state[SPANS_KEY]
+        spans = runs[-1]['spans']
+    depth = sum(1 for s in spans if s['end'] is None) if spans is not None else 0
+    record = {'span': name, 'depth': depth, 'start': time.perf_counter(), 'end': None, **fields}
+    if spans is not None:
+        spans.append(record)
+    rss_before = _rss_bytes()
+    try:
+        yield record
+    finally:
+        record['end'] = time.perf_counter()
+        record['ms'] = round((record['end'] - record['start']) * 1000, 2)
+        rss_after = _rss_bytes()
+        record['rss_bytes'] = rss_after
+        if rss_before is not None and rss_after is not None:
+            record['rss_delta_bytes'] = rss_after - rss_before
+        log_record = {k: v for k, v in record.items() if k not in ('start', 'end', 'depth')}
+        logger.info("span %s", json.dumps(log_record, ensure_ascii=False, default=str))
+
+
+def span(name, **fields):
+    """코드 구간의 실행 시간과 메모리 변화를 기록하는 컨텍스트 관리자
+
+    측정이 꺼져 있으면 아무 일도 하지 않는 빈 컨텍스트를 돌려주므로 비용이 거의 없습니다.
+    켜져 있으면 구간이 끝날 때 JSON 구조의 로그 레코드를 남기고, 현재 실행의 구간
+    목록에 추가해 디버그 패널에 표시합니다. ``fields``는 레코드에 함께 기록할 값입니다.
+
+        with span("search.text", rows=len(df)) as record:
+            ...
+            if record is not None:
+                record['matches'] = len(rows)
+    """
+    if not instrumentation_enabled():
+        return _DISABLED
+    return _timed_span(name, fields)
+
+
+def _debug_panel_body():
+    """디버그 패널 내용: 최근 실행별 구간 시간/메모리와 프로세스/캐시 현황"""
+    runs = st.session_state.get(SPANS_KEY, [])
+    st.subheader("최근 실행 구간별 시간")
+    rows = [{
+        '실행': f"{number}. {run['run']}",
+        '구간': "  " * s['depth'] + s['span'],
+        '시간(ms)': s.get('ms'),
+        '메모리 변화(MB)': round(s['rss_delta_bytes'] / 2**20, 1) if 'rss_delta_bytes' in s else None,
+    } for number, run in reversed(list(enumerate(runs, start=1))) for s in run['spans']]
+    if rows:
+        st.dataframe(pd.DataFrame(rows), hide_index=True)
+    else:
+        st.caption("측정된 구간이 없습니다.")
+
+    rss = _rss_bytes()
+    if rss is not None:
+        st.caption(f"프로세스 메모리(RSS): {rss / 2**20:,.1f} MB")
+    cache = query_cache_stats()
+    st.caption(
+        f"검색 결과 캐시: 적중 {cache['hits']:,} / 실패 {cache['misses']:,}, "
+        f"{cache['entries']:,}개 ({cache['bytes'] / 2**20:,.1f} MB)"
+    )
+    registry = get_registry().stats()
+    st.caption(
+        f"공유 데이터셋: {registry['datasets']:,}개, "
+        f"{registry['bytes'] / 2**20:,.1f} / {registry['budget_bytes'] / 2**20:,.0f} MB"
+    )
+
+
+def render_debug_panel():
+    """사이드바에 측정 켜기 체크박스와, 켜져 있으면 최근 실행들의 구간 시간/메모리를 표시하는 함수
+
+    스크립트 맨 끝에서 호출해야 이번 재실행의 모든 구간이 표에 포함됩니다. 패널은
+    DEBUG_PANEL_REFRESH_SECONDS마다 다시 그리는 fragment이므로, 검색/차트 섹션만 다시
+    실행된 경우(measured_fragment)의 구간도 전체 재실행 없이 패널에 나타납니다.
+    """
+    with st.sidebar:
+        st.markdown("---")
+        st.checkbox("성능 측정 패널 표시", key=DEBUG_PANEL_KEY)
+        if not st.session_state.get(DEBUG_PANEL_KEY):
+            return
+        st.fragment(_debug_panel_body, run_every=DEBUG_PANEL_REFRESH_SECONDS)()
@@ -0,0 +1,146 @@
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 두 버전의 행을 짝지을 때 쓰는 키 열
+DELTA_KEY_COLUMNS = ('자재코드', '공급업체', '효력시작일')
+
+# 바뀐 행(추가+변경+삭제)이 이 비율을 넘으면 새 버전이 아닌 다른 데이터로 보고 델타를 쓰지 않음
+DELTA_MAX_CHANGED_RATIO = 0.5
+
+# 보관할 델타 수와, 변경 내역 화면에 보여 줄 종류별 최대 행 수
+DELTA_MAX_ENTRIES = 16
+DELTA_PREVIEW_ROWS = 1_000
+
+# 프로세스 전체가 공유하는 델타: 새 데이터셋 키 -> 이전 버전 대비 델타
+_deltas = OrderedDict()
+_deltas_lock = threading.Lock()
+
+
+def _occurrences(ids):
+    """같은 값이 몇 번째로 나오는지(0부터)를 원래 순서대로 반환하는 함수"""
+    order = np.argsort(ids, kind='stable')
+    sorted_ids = ids[order]
+    starts = np.ones(len(ids), dtype=bool)
+    starts[1:] = sorted_ids[1:] != sorted_ids[:-1]
+    first = np.maximum.accumulate(np.where(starts, np.arange(len(ids)), 0))
+    occurrences = np.empty(len(ids), dtype=np.int64)
+    occurrences[order] = np.arange(len(ids)) - first
+    return occurrences
+
+
+def _row_keys(old, new, key_columns):
+    """두 DataFrame의 키 열 조합을 공통 정수 키 배열 두 개로 바꾸는 함수
+
+    한 버전 안에서 같은 키가 반복되면 나온 순서대로 순번을 붙여 서로 다른 키로 만들므로,
+    결과 키는 각 버전 안에서 고유합니다.
+    """
+    group = np.zeros(len(old) + len(new), dtype=np.int64)
+    for col in key_columns:
+        codes, uniques = pd.factorize(pd.concat([old[col], new[col]], ignore_index=True), use_na_sentinel=False)
+        group = pd.factorize(group * max(len(uniques), 1) + codes)[0]
+    old_ids, new_ids = group[:len(old)], group[len(old):]
+    old_occ, new_occ = _occurrences(old_ids), _occurrences(new_ids)
+    width = int(max(old_occ.max(initial=0), new_occ.max(initial=0))) + 1
+    return old_ids * width + old_occ, new_ids * width + new_occ
+
+
+def diff_datasets(old, new, key_columns=DELTA_KEY_COLUMNS):
+    """키 열로 두 버전의 행을 짝지어 추가/변경/삭제/그대로인 행을 구하는 함수
+
+    두 버전의 열 구성이 다르거나 키 열이 없으면 None을 반환합니다. 반환 dict의 위치
+    배열은 모두 정수 행 위치이며 다음 키를 가집니다.
+
+    - 'kept_old', 'kept_new': 값이 그대로인 행의 (이전, 새) 위치 쌍
+    - 'updated_old', 'updated_new': 키는 같고 다른 열 값이 바뀐 행의 (이전, 새) 위치 쌍
+    - 'inserted': 새 버전에만 있는 행의 위치
+    - 'deleted': 이전 버전에만 있는 행의 위치
+    - 'changed_new': 새 버전에서 다시 처리해야 하는 행(변경+추가)의 위치 (오름차순)
+    - 'changed_columns': 열 이름 -> 값이 바뀐 행 수
+    """
+    if list(old.columns) != list(new.columns) or not all(col in new.columns for col in key_columns):
+        return None
+    old_keys, new_keys = _row_keys(old, new, key_columns)
+    old_positions = pd.Index(old_keys).get_indexer(new_keys)
+    matched_new = np.flatnonzero(old_positions >= 0)
+    matched_old = old_positions[matched_new]
+    inserted = np.flatnonzero(old_positions < 0)
+    is_matched = np.zeros(len(old), dtype=bool)
+    is_matched[matched_old] = True
+
+    differs = np.zeros(len(matched_new), dtype=bool)
+    changed_columns = {}
+    for col in new.columns:
+        if col in key_columns:
+            continue
+        before = old[col].to_numpy()[matched_old]
+        after = new[col].to_numpy()[matched_new]
+        column_differs = ~((before == after) | (pd.isna(before) & pd.isna(after)))
+        changed_columns[col] = int(column_differs.sum())
+        differs |= column_differs
+
+    return {
+        'kept_old': matched_old[~differs],
+        'kept_new': matched_new[~differs],
+        'updated_old': matched_old[differs],
+        'updated_new': matched_new[differs],
+        'inserted': inserted,
+        'deleted': np.flatnonzero(~is_matched),
+        'changed_new': np.sort(np.concatenate([matched_new[differs], inserted])),
+        'changed_columns': changed_columns,
+    }
+
+
+def old_to_new_positions(delta):
+    """이전 버전 행 위치 -> 새 버전 행 위치 배열을 반환하는 함수 (그대로인 행만, 나머지는 -1)"""
+    mapping = np.full(delta['old_rows'], -1, dtype=np.int64)
+    mapping[delta['kept_old']] = delta['kept_new']
+    return mapping
+
+
+def compute_dataset_delta(old_key, old_df, new_key, new_df):
+    """같은 파일의 이전 버전 대비 델타를 계산해 새 데이터셋 키로 등록하고 반환하는 함수
+
+    열 구성이 다르거나 바뀐 행이 DELTA_MAX_CHANGED_RATIO를 넘으면 델타를 쓰지 않고
+    None을 반환합니다 (색인을 처음부터 새로 만듦). 변경 내역 화면용으로 종류별
+    최대 DELTA_PREVIEW_ROWS행을 함께 보관하며, 이전 버전 DataFrame 자체는 보관하지 않습니다.
+    """
+    delta = diff_datasets(old_df, new_df)
+    if delta is None:
+        logger.info("델타 없음 (열 구성이 다름): %s -> %s", old_key, new_key)
+        return None
+    changed = len(delta['updated_new']) + len(delta['inserted']) + len(delta['deleted'])
+    if changed > DELTA_MAX_CHANGED_RATIO * max(len(old_df), len(new_df), 1):
+        logger.info("델타 없음 (바뀐 행 %d개가 너무 많음): %s -> %s", changed, old_key, new_key)
+        return None
+
+    delta.update(
+        old_key=old_key,
+        new_key=new_key,
+        old_rows=len(old_df),
+        inserted_rows=new_df.iloc[delta['inserted'][:DELTA_PREVIEW_ROWS]],
+        updated_before=old_df.iloc[delta['updated_old'][:DELTA_PREVIEW_ROWS]],
+        updated_after=new_df.iloc[delta['updated_new'][:DELTA_PREVIEW_ROWS]],
+        deleted_rows=old_df.iloc[delta['deleted'][:DELTA_PREVIEW_ROWS]],
+    )
+    logger.info(
+        "델타 등록: %s -> %s (추가 %d, 변경 %d, 삭제 %d, 그대로 %d)", old_key, new_key,
+        len(delta['inserted']), len(delta['updated_new']), len(delta['deleted']), len(delta['kept_new']),
+    )
+    with _deltas_lock:
+        _deltas[new_key] = delta
+        _deltas.move_to_end(new_key)
+        while len(_deltas) > DELTA_MAX_ENTRIES:
+            _deltas.popitem(last=False)
+    return delta
+
+
+def get_delta(dataset_key):
+    """데이터셋이 이전 버전을 델타로 갱신한 것이면 그 델타를, 아니면 None을 반환하는 함수"""
+    with _deltas_lock:
+        return _deltas.get(dataset_key)
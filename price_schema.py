@@ -0,0 +1,86 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 수집 시 한 번만 날짜로 변환해 두는 열
+DATE_COLUMNS = ['효력시작일', '효력종료일', '날짜']
+
+# 같은 값이 반복되어 범주형(사전 인코딩)으로 저장하는 열 (식별자이므로 문자열로 통일)
+CATEGORY_COLUMNS = ['공급업체', '자재코드', '단위', '원본파일', '원본시트']
+
+# 숫자로 변환한 뒤 값을 잃지 않는 가장 작은 자료형으로 줄이는 열
+NUMERIC_COLUMNS = ['가격', '단가', '금액', '수량']
+
+# 위 목록에 없는 문자열 열도 고유값 비율이 이 값 이하이면 범주형으로 저장
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+
+def _downcast_numeric(series):
+    """숫자 열을 값 손실 없이 가장 작은 정수/실수 자료형으로 줄이는 함수"""
+    values = pd.to_numeric(series)
+    if pd.api.types.is_float_dtype(values):
+        finite = values.dropna()
+        if not values.hasnans and (finite == np.floor(finite)).all():
+            return pd.to_numeric(values.astype(np.int64), downcast='integer')
+        as_float32 = values.astype(np.float32)
+        if np.array_equal(as_float32.to_numpy(np.float64), values.to_numpy(np.float64), equal_nan=True):
+            return as_float32
+        return values
+    if pd.api.types.is_integer_dtype(values):
+        return pd.to_numeric(values, downcast='integer')
+    return values
+
+
+def _is_text(series):
+    """문자열(또는 여러 형식이 섞인 object) 열인지 확인하는 함수"""
+    return pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)
+
+
+def _to_category(series):
+    """값을 문자열로 통일한 뒤 범주형으로 바꾸는 함수 (빈 값은 그대로 유지)"""
+    return series.map(str, na_action='ignore').astype('category')
+
+
+def apply_price_schema(df):
+    """수집한 가격표를 메모리 효율적인 자료형으로 변환하는 함수
+
+    - 날짜 열(효력시작일 등)은 여기서 한 번만 datetime으로 변환합니다.
+    - 공급업체/자재코드처럼 반복되는 열은 범주형(사전 인코딩)으로 바꿉니다.
+    - 가격 등 숫자 열은 값을 잃지 않는 범위에서 더 작은 자료형으로 줄입니다.
+
+    변환할 수 없는 열(날짜가 아닌 값이 섞인 경우 등)은 원래 자료형 그대로 둡니다.
+    """
+    typed = {}
+    for col in df.columns:
+        series = df[col]
+        try:
+            if col in DATE_COLUMNS:
+                series = pd.to_datetime(series)
+            elif col in NUMERIC_COLUMNS:
+                series = _downcast_numeric(series)
+            elif col in CATEGORY_COLUMNS or (
+                _is_text(series) and len(series) and series.nunique() / len(series) <= CATEGORY_MAX_UNIQUE_RATIO
+            ):
+                series = _to_category(series)
+            elif pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                series = _downcast_numeric(series)
+        except (ValueError, TypeError) as e:
+            logger.info("'%s' 열은 원래 자료형을 유지합니다: %s", col, e)
+            series = df[col]
+        typed[col] = series
+    return pd.DataFrame(typed, index=df.index)
+
+
+def memory_report(df):
+    """열별 자료형과 메모리 사용량(바이트)을 표로 반환하는 함수 (마지막 행은 합계)"""
+    usage = df.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        '열': list(df.columns),
+        '자료형': [str(dtype) for dtype in df.dtypes],
+        '메모리(바이트)': usage.to_numpy(),
+    })
+    total = pd.DataFrame({'열': ['합계'], '자료형': [''], '메모리(바이트)': [int(usage.sum())]})
+    return pd.concat([report, total], ignore_index=True)
@@ -0,0 +1,91 @@
+import logging
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+# 경과일수 구간 (경계값 이하 구간, 마지막은 그 이상) 과 구간 이름
+ELAPSED_BUCKET_BINS = [-np.inf, -1, 30, 90, 180, 365, 730, np.inf]
+ELAPSED_BUCKET_LABELS = ["효력 예정", "0-30일", "31-90일", "91-180일", "181-365일", "366-730일", "731일 이상"]
+
+# 공급업체별로 계산할 경과일수 백분위
+STALENESS_PERCENTILES = [50, 90, 99]
+
+# '오래된 가격'의 기본 기준 경과일수와, 가장 오래된 목록에 표시할 행 수
+STALE_DAYS_DEFAULT = 365
+OLDEST_N = 100
+
+# 경과일수 집계를 보관할 (데이터셋, 기준일) 조합 수
+STALENESS_CACHE_MAX_ENTRIES = 16
+
+
+def elapsed_days(dates, today=None):
+    """효력시작일로부터 오늘까지의 경과일수를 벡터 연산으로 계산하는 함수"""
+    today = pd.Timestamp(today if today is not None else datetime.now())
+    return (today - pd.to_datetime(dates)).dt.days
+
+
+def elapsed_bucket_counts(days):
+    """경과일수를 구간별로 세어 ('경과일수 구간', '자재 수') DataFrame으로 반환하는 함수 (빈 값은 제외)"""
+    buckets = pd.cut(pd.Series(days), bins=ELAPSED_BUCKET_BINS, labels=ELAPSED_BUCKET_LABELS)
+    return buckets.value_counts(sort=False).rename_axis('경과일수 구간').reset_index(name='자재 수')
+
+
+def build_staleness_summary(df, today, date_column='효력시작일', supplier_column='공급업체'):
+    """데이터셋 전체의 가격 경과일수와 그 요약을 한 번에 계산하는 함수
+
+    반환값은 다음 키를 가진 dict입니다.
+
+    - 'today': 기준일
+    - 'days': 행 위치 순서의 경과일수 배열 (float64, 날짜가 없으면 NaN)
+    - 'order': 경과일수가 큰 순서의 행 위치 배열 (날짜가 없는 행은 제외)
+    - 'buckets': 경과일수 구간별 행 수 DataFrame
+    - 'suppliers': 공급업체별 행 수, 경과일수 백분위/최댓값, 기준일수 이상 비율 DataFrame
+      (공급업체 열이 없으면 None)
+    """
+    days = elapsed_days(df[date_column], today).to_numpy(dtype=np.float64, na_value=np.nan)
+    dated = np.flatnonzero(~np.isnan(days))
+    order = dated[np.argsort(-days[dated], kind='stable')]
+
+    suppliers = None
+    if supplier_column in df.columns:
+        frame = pd.DataFrame({
+            '공급업체': df[supplier_column].to_numpy()[dated],
+            '경과일수': days[dated],
+            '기준 이상': days[dated] >= STALE_DAYS_DEFAULT,
+        })
+        grouped = frame.groupby('공급업체', observed=True, sort=True)
+        suppliers = grouped['경과일수'].quantile([p / 100 for p in STALENESS_PERCENTILES]).unstack()
+        suppliers.columns = [f"{p}% 경과일수" for p in STALENESS_PERCENTILES]
+        suppliers.insert(0, '행 수', grouped.size())
+        suppliers['최대 경과일수'] = grouped['경과일수'].max()
+        suppliers[f"{STALE_DAYS_DEFAULT}일 이상 비율(%)"] = (grouped['기준 이상'].mean() * 100).round(1)
+        suppliers = suppliers.sort_values(f"{STALENESS_PERCENTILES[-1]}% 경과일수", ascending=False).reset_index()
+
+    return {
+        'today': today,
+        'days': days,
+        'order': order,
+        'buckets': elapsed_bucket_counts(days),
+        'suppliers': suppliers,
+    }
+
+
+@st.cache_resource(max_entries=STALENESS_CACHE_MAX_ENTRIES, show_spinner="가격 경과일수를 집계하는 중...")
+def get_staleness_summary(dataset_key, today, _df, date_column='효력시작일', supplier_column='공급업체'):
+    """(데이터셋 키, 기준일)별로 경과일수 집계를 한 번만 만들어 모든 세션이 공유하는 함수"""
+    logger.info("가격 경과일수 집계 생성: %s (기준일 %s)", dataset_key, today)
+    return build_staleness_summary(_df, today, date_column, supplier_column)
+
+
+def dataset_elapsed_days(dataset_key, df):
+    """데이터셋 전체의 오늘 기준 경과일수 배열(행 위치 순서)을 반환하는 함수"""
+    return get_staleness_summary(dataset_key, date.today(), df)['days']
+
+
+def stale_rows(summary, min_days):
+    """경과일수가 ``min_days`` 이상인 행 위치를 경과일수가 큰 순서로 반환하는 함수"""
+    return summary['order'][:np.count_nonzero(summary['days'] >= min_days)]
@@ -0,0 +1,288 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from price_schema import apply_price_schema
+
+logger = logging.getLogger(__name__)
+
+# 가격 저장소(SQLite 파일) 경로. 비어 있으면 저장소를 쓰지 않음 (환경 변수로 켬)
+PRICE_STORE_PATH = os.environ.get("PRICE_STORE_PATH", "")
+
+# 저장소에 보관할 최대 데이터셋 수 (초과하면 가장 오래전에 저장한 것부터 삭제)
+PRICE_STORE_MAX_DATASETS = int(os.environ.get("PRICE_STORE_MAX_DATASETS", "8"))
+
+# 저장할 때 한 번에 INSERT하는 행 수와, 자재코드 일괄 조회 때 IN (...)에 한 번에 넣는 코드 수
+STORE_INSERT_ROWS = 50_000
+STORE_LOOKUP_CHUNK = 500
+
+# 색인을 만드는 열: 자재코드/공급업체/효력시작일은 B-tree, 텍스트 검색 열은 FTS5 트라이그램
+STORE_CODE_COLUMN = '자재코드'
+STORE_SUPPLIER_COLUMN = '공급업체'
+STORE_DATE_COLUMN = '효력시작일'
+
+# FTS5 트라이그램 색인은 3글자 이상인 검색어에만 쓸 수 있음
+FTS_MIN_QUERY_CHARS = 3
+
+# 원래 행 위치를 저장하는 열 이름 (가격표 열 이름과 겹치지 않도록 밑줄로 시작)
+ROW_ID_COLUMN = '_row_id'
+
+_CATALOG_SQL = """
+CREATE TABLE IF NOT EXISTS datasets (
+    dataset_key TEXT PRIMARY KEY,
+    names TEXT NOT NULL,
+    row_count INTEGER NOT NULL,
+    text_columns TEXT NOT NULL,
+    stored_at TEXT NOT NULL
+)
+"""
+
+
+def _quote(name):
+    """SQL 식별자(테이블/열 이름)를 큰따옴표로 감싸는 함수"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _table(kind, dataset_key):
+    """데이터셋의 테이블 이름 (data: 원본 행, keys: B-tree 색인 열, fts: 텍스트 검색 색인)"""
+    return _quote(f"{kind}_{dataset_key}")
+
+
+def _fts_phrase(col, query):
+    """FTS5 MATCH 식에서 한 열의 부분 문자열 조건을 만드는 함수 (트라이그램 구문 검색)"""
+    return "{" + col.replace('"', '""') + "} : \"" + query.replace('"', '""') + "\""
+
+
+class PriceStore:
+    """수집한 가격표를 SQLite 파일에 보관하고 색인 검색을 제공하는 저장소
+
+    데이터셋마다 세 테이블을 만듭니다.
+
+    - data: 원본 행 전체 (서버를 다시 시작해도 파일을 다시 올리지 않고 불러오기 위함)
+    - keys: 정규화한 자재코드/공급업체와 효력시작일, 각 열에 B-tree 색인
+    - fts: 정규화한 텍스트 검색 열의 FTS5 트라이그램 색인
+
+    날짜/자재코드 조회는 메모리 색인이 더 빠르므로, 검색 모듈은 그 데이터셋의 메모리
+    색인이 아직 없을 때(저장소에서 불러온 직후 등)만 B-tree 색인을 씁니다.
+
+    모든 테이블의 행 번호는 DataFrame의 행 위치와 같으므로, 검색 결과를 메모리 검색과
+    똑같이 행 위치 배열로 돌려줍니다. 정규화는 호출한 쪽(검색 모듈)이 넘겨 준 검색 열을
+    그대로 쓰므로 메모리 검색과 결과가 같습니다. 연결은 스레드마다 따로 열고, WAL 모드라
+    저장 중에도 다른 세션이 읽을 수 있습니다.
+    """
+
+    def __init__(self, path, max_datasets=PRICE_STORE_MAX_DATASETS):
+        self.path = path
+        self.max_datasets = max_datasets
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._text_columns = {}  # 저장을 마친 데이터셋 키 -> 텍스트 검색 열 목록
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute(_CATALOG_SQL)
+            for key, text_columns in con.execute("SELECT dataset_key, text_columns FROM datasets"):
+                self._text_columns[key] = json.loads(text_columns)
+
+    def _connect(self):
+        """현재 스레드의 SQLite 연결을 반환하는 함수 (처음 쓰는 스레드면 새로 엶)"""
+        con = getattr(self._local, 'con', None)
+        if con is None:
+            con = self._local.con = sqlite3.connect(self.path, timeout=30)
+            con.execute("PRAGMA synchronous=NORMAL")
+        return con
+
+    def close(self):
+        """현재 스레드의 SQLite 연결을 닫는 함수"""
+        con = getattr(self._local, 'con', None)
+        if con is not None:
+            con.close()
+            self._local.con = None
+
+    def has_dataset(self, dataset_key):
+        """데이터셋 저장을 마쳤는지 확인하는 함수 (저장 중인 데이터셋은 False)"""
+        return dataset_key in self._text_columns
+
+    def list_datasets(self):
+        """저장된 데이터셋을 최근에 저장한 순서로 [{'dataset_key', 'names', 'row_count', 'stored_at'}] 반환하는 함수"""
+        rows = self._connect().execute(
+            "SELECT dataset_key, names, row_count, stored_at FROM datasets ORDER BY stored_at DESC"
+        ).fetchall()
+        return [
+            {'dataset_key': key, 'names': json.loads(names), 'row_count': row_count, 'stored_at': stored_at}
+            for key, names, row_count, stored_at in rows
+        ]
+
+    def save_dataset(self, dataset_key, df, names, search_columns):
+        """데이터셋을 저장하고 색인을 만드는 함수 (이미 있으면 아무것도 하지 않음)
+
+        ``search_columns``는 검색 모듈이 만든 정규화 검색 열(열 이름 -> Series)입니다.
+        같은 파일 이름 목록의 이전 버전은 새 버전으로 대체되었으므로 지우고, 전체
+        데이터셋 수가 상한을 넘으면 가장 오래전에 저장한 것부터 지웁니다. 목록(catalog)
+        행은 모든 테이블과 색인을 만든 뒤 같은 트랜잭션에서 마지막에 넣으므로, 저장이
+        끝나기 전에는 검색에 쓰이지 않습니다.
+        """
+        if self.has_dataset(dataset_key):
+            return
+        text_columns = list(search_columns)
+        row_ids = np.arange(len(df))
+        with self._write_lock:
+            con = self._connect()
+            with con:
+                data = _table('data', dataset_key)
+                con.execute(f"DROP TABLE IF EXISTS {data}")
+                df.to_sql(
+                    f"data_{dataset_key}", con, index=True, index_label=ROW_ID_COLUMN, chunksize=STORE_INSERT_ROWS,
+                )
+
+                keys = _table('keys', dataset_key)
+                con.execute(f"DROP TABLE IF EXISTS {keys}")
+                con.execute(f"CREATE TABLE {keys} (row_id INTEGER PRIMARY KEY, code TEXT, supplier TEXT, start_date TEXT)")
+                empty = [None] * len(df)
+                code = search_columns[STORE_CODE_COLUMN].tolist() if STORE_CODE_COLUMN in search_columns else empty
+                supplier = (
+                    search_columns[STORE_SUPPLIER_COLUMN].tolist() if STORE_SUPPLIER_COLUMN in search_columns else empty
+                )
+                start_date = empty
+                if STORE_DATE_COLUMN in df.columns:
+                    # ISO 형식 문자열은 사전 순서가 날짜 순서와 같아 B-tree 범위 검색에 그대로 쓸 수 있음
+                    dates = pd.to_datetime(df[STORE_DATE_COLUMN]).to_numpy()
+                    start_date = np.where(np.isnat(dates), None, np.datetime_as_string(dates, unit='s')).tolist()
+                con.executemany(
+                    f"INSERT INTO {keys} VALUES (?, ?, ?, ?)", zip(row_ids.tolist(), code, supplier, start_date)
+                )
+                for col in ('code', 'supplier', 'start_date'):
+                    con.execute(f"CREATE INDEX {_table(f'keys_{col}', dataset_key)} ON {keys} ({col})")
+
+                fts = _table('fts', dataset_key)
+                con.execute(f"DROP TABLE IF EXISTS {fts}")
+                con.execute(
+                    f"CREATE VIRTUAL TABLE {fts} USING fts5({', '.join(map(_quote, text_columns))}, tokenize='trigram')"
+                )
+                con.executemany(
+                    f"INSERT INTO {fts} (rowid, {', '.join(map(_quote, text_columns))}) "
+                    f"VALUES (?{', ?' * len(text_columns)})",
+                    zip(row_ids.tolist(), *(search_columns[col].tolist() for col in text_columns)),
+                )
+
+                con.execute(
+                    "INSERT INTO datasets VALUES (?, ?, ?, ?, ?)",
+                    (dataset_key, json.dumps(list(names), ensure_ascii=False), len(df),
+                     json.dumps(text_columns, ensure_ascii=False), datetime.now().isoformat(timespec='seconds')),
+                )
+            self._text_columns[dataset_key] = text_columns
+            logger.info("가격 저장소에 저장: %s (%d행)", dataset_key, len(df))
+            self._prune(dataset_key, names)
+
+    def _prune(self, keep_key, names):
+        """같은 파일 이름 목록의 이전 버전과 상한을 넘는 오래된 데이터셋을 지우는 함수 (쓰기 잠금 안에서 호출)"""
+        stored = self.list_datasets()
+        superseded = [
+            d['dataset_key'] for d in stored if d['dataset_key'] != keep_key and sorted(d['names']) == sorted(names)
+        ]
+        overflow = [
+            d['dataset_key'] for d in stored[self.max_datasets:]
+            if d['dataset_key'] != keep_key and d['dataset_key'] not in superseded
+        ]
+        for dataset_key in superseded + overflow:
+            self._drop(dataset_key)
+
+    def _drop(self, dataset_key):
+        """데이터셋의 테이블과 목록 행을 지우는 함수 (쓰기 잠금 안에서 호출)"""
+        self._text_columns.pop(dataset_key, None)
+        con = self._connect()
+        with con:
+            con.execute("DELETE FROM datasets WHERE dataset_key = ?", (dataset_key,))
+            for kind in ('data', 'keys', 'fts'):
+                con.execute(f"DROP TABLE IF EXISTS {_table(kind, dataset_key)}")
+        logger.info("가격 저장소에서 삭제: %s", dataset_key)
+
+    def load_dataset(self, dataset_key):
+        """저장된 데이터셋을 DataFrame으로 읽어 자료형을 다시 정리해 반환하는 함수 (없으면 None)"""
+        if not self.has_dataset(dataset_key):
+            return None
+        df = pd.read_sql(
+            f"SELECT * FROM {_table('data', dataset_key)} ORDER BY {_quote(ROW_ID_COLUMN)}", self._connect(),
+        )
+        return apply_price_schema(df.drop(columns=ROW_ID_COLUMN))
+
+    def _row_ids(self, sql, params=()):
+        """행 번호 하나를 돌려주는 쿼리를 실행해 정수 배열로 반환하는 함수"""
+        cursor = self._connect().execute(sql, params)
+        return np.fromiter((row_id for (row_id,) in cursor), dtype=np.intp)
+
+    def find_rows(self, dataset_key, terms, match_all=True):
+        """정규화된 (열, 검색어) 조건에 맞는 행 위치를 FTS 색인으로 찾아 오름차순으로 반환하는 함수
+
+        FTS 색인을 쓸 수 없으면 None을 반환합니다 (호출한 쪽이 메모리 검색으로 처리).
+        색인에 없는 열의 조건이 있어도 None을 반환합니다 (검색 열이 늘기 전에 저장한 데이터셋).
+
+        - AND: 3글자 이상인 검색어가 하나 이상 있으면 그것들로 FTS 검색하고, 짧은
+          검색어는 그 결과 안에서 instr()로 확인합니다.
+        - OR: 모든 검색어가 3글자 이상이어야 합니다 (짧은 검색어가 있으면 전체를 훑어야 하므로).
+        """
+        text_columns = self._text_columns.get(dataset_key)
+        if text_columns is None or any(col not in text_columns for col, _ in terms):
+            return None
+        long_terms = [(col, query) for col, query in terms if len(query) >= FTS_MIN_QUERY_CHARS]
+        short_terms = [(col, query) for col, query in terms if len(query) < FTS_MIN_QUERY_CHARS]
+        if not long_terms or (short_terms and not match_all):
+            return None
+        fts = _table('fts', dataset_key)
+        match = (" AND " if match_all else " OR ").join(_fts_phrase(col, query) for col, query in long_terms)
+        sql = f"SELECT rowid FROM {fts} WHERE {fts} MATCH ?"
+        params = [match]
+        for col, query in short_terms:
+            sql += f" AND instr({_quote(col)}, ?) > 0"
+            params.append(query)
+        return self._row_ids(sql + " ORDER BY rowid", params)
+
+    def find_rows_by_date(self, dataset_key, start, end):
+        """효력시작일이 시작일~종료일(양 끝 포함, 날짜 단위)인 행 위치를 B-tree 색인으로 찾아 반환하는 함수"""
+        if not self.has_dataset(dataset_key):
+            return None
+        end = (pd.Timestamp(end) + pd.Timedelta(days=1)).date()
+        return np.sort(self._row_ids(
+            f"SELECT row_id FROM {_table('keys', dataset_key)} WHERE start_date >= ? AND start_date < ?",
+            (start.isoformat(), end.isoformat()),
+        ))
+
+    def find_rows_by_codes(self, dataset_key, codes):
+        """정규화된 자재코드 목록과 정확히 일치하는 (행 위치, 찾은 코드 집합)을 B-tree 색인으로 찾는 함수 (없으면 None)"""
+        if not self.has_dataset(dataset_key):
+            return None
+        keys = _table('keys', dataset_key)
+        codes = list(dict.fromkeys(codes))
+        rows, found = [], set()
+        for start in range(0, len(codes), STORE_LOOKUP_CHUNK):
+            chunk = codes[start:start + STORE_LOOKUP_CHUNK]
+            cursor = self._connect().execute(
+                f"SELECT code, row_id FROM {keys} WHERE code IN ({', '.join('?' * len(chunk))})", chunk,
+            )
+            for code, row_id in cursor:
+                found.add(code)
+                rows.append(row_id)
+        return np.sort(np.array(rows, dtype=np.intp)), found
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_price_store():
+    """프로세스 전체가 공유하는 가격 저장소를 반환하는 함수 (PRICE_STORE_PATH가 비어 있으면 None)"""
+    global _store
+    if not PRICE_STORE_PATH:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = PriceStore(PRICE_STORE_PATH)
+        return _store
@@ -0,0 +1,88 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+# 가격 추이 집계 단위 (표시 이름 -> pandas resample 규칙)
+ROLLUP_FREQUENCIES = {'일별': 'D', '주별': 'W-MON', '월별': 'MS'}
+
+# 가격 추이 차트에 그릴 최대 점 수 (넘으면 LTTB로 모양을 유지하며 줄임)
+TREND_MAX_POINTS = 500
+
+# 집계 결과를 보관할 데이터셋 수
+ROLLUP_CACHE_MAX_ENTRIES = 16
+
+
+def build_price_rollups(df, date_column='날짜', price_column='가격'):
+    """날짜별 가격을 일별/주별/월별로 미리 집계하는 함수
+
+    반환값은 {집계 단위: DataFrame} dict이며, 각 DataFrame은 기간 시작일을 인덱스로
+    최저가(min)/최고가(max)/평균가(mean)/마지막 가격(last)/건수(count) 열을 가집니다.
+    주별 기간은 월요일에 시작합니다. 날짜나 가격이 비어 있거나 변환할 수 없는 행은
+    제외하고, 데이터가 없는 기간은 넣지 않습니다.
+    """
+    dates = pd.to_datetime(df[date_column], errors='coerce').to_numpy()
+    prices = pd.to_numeric(df[price_column], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    valid = ~np.isnat(dates) & ~np.isnan(prices)
+    series = pd.Series(prices[valid], index=pd.DatetimeIndex(dates[valid])).sort_index(kind='stable')
+
+    rollups = {}
+    for label, rule in ROLLUP_FREQUENCIES.items():
+        frame = series.resample(rule, label='left', closed='left').agg(['min', 'max', 'mean', 'last', 'count'])
+        rollups[label] = frame[frame['count'] > 0]
+    return rollups
+
+
+@st.cache_resource(max_entries=ROLLUP_CACHE_MAX_ENTRIES, show_spinner=False)
+def get_price_rollups(dataset_key, _df, date_column='날짜', price_column='가격'):
+    """데이터셋 키별로 가격 추이 집계를 한 번만 만들어 모든 세션이 공유하는 함수"""
+    logger.info("가격 추이 집계 생성: %s (%s, %s)", dataset_key, date_column, price_column)
+    return build_price_rollups(_df, date_column, price_column)
+
+
+def lttb_indices(x, y, threshold):
+    """Largest-Triangle-Three-Buckets로 선 그래프 모양을 유지할 점의 위치를 고르는 함수
+
+    첫 점과 마지막 점은 항상 남기고, 나머지 점은 ``threshold - 2``개 구간으로 나눠
+    구간마다 앞에서 고른 점, 다음 구간 평균과 만드는 삼각형 넓이가 가장 큰 점을
+    하나씩 고릅니다. 점 수가 ``threshold`` 이하이면 모든 위치를 돌려줍니다.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.intp)  # 가운데 점들을 나눈 구간 경계
+
+    selected = np.empty(threshold, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        areas = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+    return selected
+
+
+def trend_window(rollup, start, end, max_points=TREND_MAX_POINTS):
+    """집계 결과에서 시작일~종료일(양 끝 포함) 기간만 잘라내고, 점이 많으면 LTTB로 줄이는 함수
+
+    기간은 정렬된 인덱스에서 이진 탐색으로 자르며, 점 선택은 평균가 선의 모양을 기준으로
+    합니다 (최저가/최고가/마지막 가격은 같은 기간의 값을 함께 표시).
+    반환값은 (표시할 점 DataFrame, 기간 안의 전체 집계 기간 수)입니다.
+    """
+    window = rollup.loc[pd.Timestamp(start):pd.Timestamp(end) + pd.Timedelta(days=1) - pd.Timedelta(1)]
+    if len(window) <= max_points:
+        return window, len(window)
+    x = window.index.asi8
+    return window.iloc[lttb_indices(x, window['mean'].to_numpy(), max_points)], len(window)
@@ -0,0 +1,92 @@
+import io
+import logging
+import tempfile
+
+import openpyxl
+
+logger = logging.getLogger(__name__)
+
+# 한 번에 변환해 파일에 쓰는 행 수 (파일을 만드는 동안 변환 중인 데이터는 이 크기로 제한됨)
+EXPORT_CHUNK_ROWS = 20_000
+
+# XLSX 시트 하나에 넣을 수 있는 최대 데이터 행 수 (머리글 1행 제외)
+XLSX_MAX_ROWS_PER_SHEET = 1_048_575
+
+# 내보내기 형식 -> (확장자, MIME 형식)
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'XLSX': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+
+def _chunks(df, chunk_rows):
+    """DataFrame을 chunk_rows 행씩 잘라 차례로 돌려주는 제너레이터 (복사 없이 iloc 조각)"""
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def write_csv(df, file, chunk_rows=EXPORT_CHUNK_ROWS):
+    """DataFrame을 조각 단위로 CSV(UTF-8 BOM, 엑셀에서 한글이 깨지지 않음)로 바이너리 파일에 쓰는 함수"""
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    df.iloc[:0].to_csv(text, index=False)  # 결과가 없어도 머리글은 씀
+    for chunk in _chunks(df, chunk_rows):
+        chunk.to_csv(text, index=False, header=False)
+    text.flush()
+    text.detach()  # file은 닫지 않고 호출한 쪽에 돌려줌
+
+
+def _xlsx_rows(chunk):
+    """조각의 각 행을 openpyxl이 쓸 수 있는 값 튜플로 돌려주는 함수 (빈 값은 None)"""
+    columns = [chunk[col].astype(object).where(chunk[col].notna(), None).tolist() for col in chunk.columns]
+    return zip(*columns)
+
+
+def write_xlsx(df, file, chunk_rows=EXPORT_CHUNK_ROWS, sheet_title="검색 결과"):
+    """DataFrame을 openpyxl 쓰기 전용 모드로 조각 단위로 XLSX 파일에 쓰는 함수
+
+    쓰기 전용 통합 문서는 행을 바로 임시 XML로 흘려보내므로 전체 시트를 메모리에
+    만들지 않습니다. 행 수가 시트 한도를 넘으면 '검색 결과 (2)'처럼 시트를 나눕니다.
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    header = [str(col) for col in df.columns]
+    sheet_starts = range(0, max(len(df), 1), XLSX_MAX_ROWS_PER_SHEET)
+    for number, sheet_start in enumerate(sheet_starts, start=1):
+        sheet = workbook.create_sheet(sheet_title if number == 1 else f"{sheet_title} ({number})")
+        sheet.append(header)
+        part = df.iloc[sheet_start:sheet_start + XLSX_MAX_ROWS_PER_SHEET]
+        for chunk in _chunks(part, chunk_rows):
+            for row in _xlsx_rows(chunk):
+                sheet.append(row)
+    workbook.save(file)
+
+
+def export_file(df, fmt):
+    """검색 결과를 지정한 형식으로 임시 파일에 써서, 처음으로 되감은 파일 객체를 반환하는 함수
+
+    임시 파일은 이름 없이 만들어지므로 파일 객체가 닫히면 자동으로 지워집니다.
+    """
+    file = tempfile.TemporaryFile()
+    try:
+        if fmt == 'CSV':
+            write_csv(df, file)
+        else:
+            write_xlsx(df, file)
+    except Exception:
+        file.close()
+        raise
+    logger.info("검색 결과 내보내기: %s %d행, %d바이트", fmt, len(df), file.tell())
+    file.seek(0)
+    return file
+
+
+def export_bytes(df, fmt):
+    """검색 결과를 지정한 형식의 파일 내용(bytes)으로 반환하는 함수 (임시 파일은 바로 닫아 지움)
+
+    st.download_button의 지연 생성(callable)에서 호출하도록 만든 함수입니다. 파일은
+    조각 단위로 디스크의 임시 파일에 만들므로 DataFrame 전체를 한 번에 문자열로 바꾸지
+    않고, 최대 메모리는 완성된 파일 크기에 조각 하나만큼만 더해집니다. Streamlit은
+    내려받을 파일을 bytes로 보관하므로(세션의 다음 실행 때 정리) 완성된 파일 한 벌은
+    메모리에 남습니다.
+    """
+    with export_file(df, fmt) as file:
+        return file.read()
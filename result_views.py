@@ -0,0 +1,334 @@
+import logging
+import math
+from datetime import date
+from functools import partial
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import streamlit as st
+
+from instrumentation import measured_fragment, span
+from price_delta import DELTA_PREVIEW_ROWS, get_delta
+from price_staleness import (
+    OLDEST_N, STALE_DAYS_DEFAULT, elapsed_bucket_counts, elapsed_days, get_staleness_summary, stale_rows,
+)
+from result_export import EXPORT_FORMATS, export_bytes
+
+logger = logging.getLogger(__name__)
+
+# 한 페이지에 표시할 행 수 선택지
+PAGE_SIZE_OPTIONS = [50, 100, 200, 500, 1000]
+
+# 정렬 순서 캐시에 보관할 (데이터셋, 열, 방향) 조합 수
+SORT_CACHE_MAX_ENTRIES = 64
+
+NO_SORT_LABEL = "(정렬 안 함)"
+
+# 이 행 수를 넘는 결과는 XLSX 생성이 오래 걸린다고 안내
+EXPORT_XLSX_SLOW_ROWS = 100_000
+
+# 경과일수 차트 표시 방식
+CHART_MODE_TOP_N = "상위 N개"
+CHART_MODE_BUCKETS = "경과일수 구간별 집계"
+CHART_MODE_ALL = "전체 보기"
+CHART_MODES = [CHART_MODE_TOP_N, CHART_MODE_BUCKETS, CHART_MODE_ALL]
+
+# 상위 N개 모드의 기본값/최댓값 (막대 수가 곧 차트 전송량이므로 상한을 둠)
+CHART_TOP_N_DEFAULT = 30
+CHART_TOP_N_MAX = 200
+
+
+def sort_positions(series, ascending=True):
+    """열 값 기준으로 정렬된 행 위치 배열을 반환하는 함수 (빈 값은 항상 마지막)
+
+    숫자와 문자가 섞인 열처럼 값끼리 비교할 수 없으면 문자열로 바꿔 정렬합니다.
+    """
+    series = series.reset_index(drop=True)
+    try:
+        ordered = series.sort_values(ascending=ascending, kind='stable', na_position='last')
+    except TypeError:
+        ordered = series.astype(str).sort_values(ascending=ascending, kind='stable')
+    return ordered.index.to_numpy()
+
+
+@st.cache_resource(max_entries=SORT_CACHE_MAX_ENTRIES, show_spinner=False)
+def get_sort_positions(sort_cache_key, column, ascending, _series):
+    """데이터셋 키별 정렬 순서를 한 번만 계산해 모든 세션이 공유하는 함수"""
+    logger.info("정렬 순서 계산: %s (%s, %s)", sort_cache_key, column, "오름차순" if ascending else "내림차순")
+    return sort_positions(_series, ascending)
+
+
+@measured_fragment
+def paginated_dataframe(df, key, sort_cache_key=None):
+    """DataFrame을 서버에서 정렬/열 선택/페이지 나눔 한 뒤 현재 페이지만 표시하는 함수
+
+    브라우저로는 선택한 열의 현재 페이지 행만 전송하므로, 재실행 비용이 전체 행 수와
+    무관합니다. fragment이므로 페이지/정렬 위젯을 조작하면 이 표만 다시 그립니다. ``sort_cache_key``(보통 데이터셋 키)를 넘기면 정렬 순서를 캐시해
+    같은 데이터셋을 보는 모든 세션이 재사용합니다. ``key``는 위젯 키 접두어입니다.
+    """
+    total_rows = len(df)
+    columns = list(df.columns)
+
+    col_select, col_sort, col_order, col_size = st.columns([3, 2, 1, 1])
+    with col_select:
+        shown_columns = st.multiselect("표시할 열", columns, default=columns, key=f"{key}_columns")
+    with col_sort:
+        sort_column = st.selectbox("정렬 기준", [NO_SORT_LABEL] + columns, key=f"{key}_sort")
+    with col_order:
+        ascending = st.radio("정렬 방향", ["오름차순", "내림차순"], key=f"{key}_order") == "오름차순"
+    with col_size:
+        page_size = st.selectbox("페이지당 행 수", PAGE_SIZE_OPTIONS, key=f"{key}_page_size")
+
+    page_count = max(math.ceil(total_rows / page_size), 1)
+    page_key = f"{key}_page"
+    # 데이터가 바뀌어 페이지 수가 줄었으면 현재 페이지를 범위 안으로 맞춤
+    if st.session_state.get(page_key, 1) > page_count:
+        st.session_state[page_key] = page_count
+    page = st.number_input("페이지", min_value=1, max_value=page_count, step=1, key=page_key)
+
+    start = (page - 1) * page_size
+    end = min(start + page_size, total_rows)
+    if sort_column == NO_SORT_LABEL:
+        page_df = df.iloc[start:end]
+    else:
+        if sort_cache_key is not None:
+            positions = get_sort_positions(sort_cache_key, sort_column, ascending, df[sort_column])
+        else:
+            positions = sort_positions(df[sort_column], ascending)
+        page_df = df.iloc[positions[start:end]]
+
+    with span("table.render", key=key, rows=len(page_df)):
+        st.dataframe(page_df[shown_columns] if shown_columns else page_df)
+    st.caption(f"전체 {total_rows:,}행 중 {start + 1 if total_rows else 0:,}–{end:,}행 ({page} / {page_count} 페이지)")
+
+
+def render_export_buttons(df, key, file_stem="검색결과"):
+    """DataFrame을 CSV/XLSX 파일로 내려받는 버튼을 표시하는 함수
+
+    파일은 버튼을 누른 뒤에야 스크립트와 별도 스레드에서 만들므로(st.download_button의
+    지연 생성) 결과가 커도 화면 실행을 막지 않습니다. 파일은 조각 단위로 임시 파일에
+    쓴 뒤 읽어 넘기므로 최대 메모리는 완성된 파일 크기 정도이며(export_bytes), 그 파일
+    내용은 Streamlit이 세션의 다음 실행 때까지 메모리에 보관합니다.
+    """
+    for column, (fmt, (extension, mime)) in zip(st.columns(len(EXPORT_FORMATS)), EXPORT_FORMATS.items()):
+        with column:
+            st.download_button(
+                f"{fmt}로 내려받기",
+                data=partial(export_bytes, df, fmt),
+                file_name=f"{file_stem}.{extension}",
+                mime=mime,
+                key=f"{key}_export_{extension}",
+                on_click="ignore",
+            )
+    if len(df) > EXPORT_XLSX_SLOW_ROWS:
+        st.caption(f"결과가 {len(df):,}행이라 XLSX 파일은 만드는 데 시간이 걸립니다. 빠르게 받으려면 CSV를 선택하세요.")
+
+
+def chart_labels(df, label_columns=('자재명', '자재코드', '공급업체')):
+    """차트 라벨 '자재명 (자재코드) (공급업체)'을 열 단위 문자열 연산으로 만드는 함수
+
+    데이터셋에 없는 열은 라벨에서 생략합니다.
+    """
+    parts = [df[col].astype(str) for col in label_columns if col in df.columns]
+    if not parts:
+        return pd.Series(df.index.astype(str), index=df.index)
+    labels = parts[0]
+    for part in parts[1:]:
+        labels = labels + ' (' + part + ')'
+    return labels
+
+
+def build_bucket_chart(counts, title):
+    """경과일수 구간별 행 수(elapsed_bucket_counts 결과)를 가로 막대 차트로 만드는 함수"""
+    fig = px.bar(
+        counts,
+        x='자재 수',
+        y='경과일수 구간',
+        orientation='h',
+        title=title,
+        text='자재 수',
+        color_discrete_sequence=['darkorange']
+    )
+    fig.update_layout(yaxis={'autorange': 'reversed'})
+    fig.update_traces(textposition='outside')
+    return fig
+
+
+def build_elapsed_chart(df, title, mode=CHART_MODE_TOP_N, top_n=CHART_TOP_N_DEFAULT,
+                        label_columns=('자재명', '자재코드', '공급업체'), days=None):
+    """검색 결과의 가격 변경 경과일수 막대 차트(plotly Figure)를 만드는 함수
+
+    - 상위 N개: 경과일수가 큰 N개 행만 막대로 표시
+    - 구간별 집계: 경과일수 구간마다 행 수를 막대로 표시 (막대 수 고정)
+    - 전체 보기: 모든 행을 막대로 표시
+
+    ``days``는 df 행 순서의 경과일수이며, 주지 않으면 효력시작일로 계산합니다.
+    라벨은 실제로 그릴 행에 대해서만 만들고, 원본 DataFrame은 수정하지 않습니다.
+    """
+    if days is None:
+        days = elapsed_days(df['효력시작일'])
+    days = pd.Series(np.asarray(days, dtype=np.float64))  # 인덱스 = 행 위치
+    if not days.hasnans:
+        days = days.astype(np.int64)
+
+    if mode == CHART_MODE_BUCKETS:
+        fig = build_bucket_chart(elapsed_bucket_counts(days), f'{title} (구간별)')
+    else:
+        if mode == CHART_MODE_TOP_N:
+            days = days.nlargest(top_n)
+        else:
+            days = days.sort_values(ascending=False)
+        chart_df = pd.DataFrame({
+            '경과일수': days.to_numpy(),
+            '차트_라벨': chart_labels(df.iloc[days.index], label_columns).to_numpy(),
+        })
+        fig = px.bar(
+            chart_df,
+            x='경과일수',
+            y='차트_라벨',
+            orientation='h',
+            title=title,
+            labels={'경과일수': '경과 일수', '차트_라벨': '자재 정보'},
+            text='경과일수',
+            color_discrete_sequence=['darkorange']
+        )
+        fig.update_layout(yaxis={'autorange': 'reversed'})
+        fig.update_traces(texttemplate='%{text} days', textposition='outside')
+
+    fig.update_layout(
+        title_font_size=20,
+        margin={'t': 50, 'b': 20},
+        xaxis_title_font_size=14,
+        yaxis_title_font_size=14
+    )
+    return fig
+
+
+@measured_fragment
+def render_elapsed_chart(df, title, key, label_columns=('자재명', '자재코드', '공급업체'), dataset_days=None):
+    """표시 방식 선택 위젯과 함께 경과일수 차트를 그리는 함수
+
+    기본은 상위 N개 모드라서 검색 결과가 아무리 커도 차트 크기가 제한되며,
+    모든 행이 필요하면 '전체 보기'를 선택할 수 있습니다. fragment이므로 표시 방식을
+    바꾸면 이 차트만 다시 그립니다.
+
+    ``dataset_days``에 데이터셋 전체의 경과일수(dataset_elapsed_days)를 주면 df의
+    인덱스(데이터셋 행 위치)로 골라 쓰고 경과일수를 다시 계산하지 않습니다.
+    """
+    col_mode, col_n = st.columns([2, 1])
+    with col_mode:
+        mode = st.radio("차트 표시 방식", CHART_MODES, horizontal=True, key=f"{key}_mode")
+    top_n = CHART_TOP_N_DEFAULT
+    if mode == CHART_MODE_TOP_N:
+        with col_n:
+            top_n = st.slider("표시할 자재 수", 5, CHART_TOP_N_MAX, CHART_TOP_N_DEFAULT, key=f"{key}_top_n")
+
+    with span("chart.build", mode=mode, rows=len(df)):
+        days = dataset_days[df.index.to_numpy()] if dataset_days is not None else None
+        fig = build_elapsed_chart(df, title, mode=mode, top_n=top_n, label_columns=label_columns, days=days)
+    with span("chart.render"):
+        st.plotly_chart(fig, use_container_width=True)
+    if mode == CHART_MODE_TOP_N and len(df) > top_n:
+        st.caption(f"경과일수가 큰 상위 {top_n}개만 표시했습니다. (전체 {len(df):,}개)")
+    elif mode == CHART_MODE_ALL and len(df) > CHART_TOP_N_MAX:
+        st.caption(f"전체 {len(df):,}개 막대를 표시합니다. 결과가 많으면 차트를 그리는 데 시간이 걸릴 수 있습니다.")
+
+
+@measured_fragment
+def render_staleness_summary(df, dataset_key, key):
+    """데이터셋 전체의 가격 경과 현황(구간별 분포, 공급업체별 백분위, 오래된 가격 목록)을 표시하는 함수
+
+    집계는 (데이터셋 키, 오늘 날짜)마다 한 번만 만들어 모든 세션이 공유하므로, 검색 없이
+    바로 표시되고 기준 경과일수를 바꿔도 이 섹션만 다시 그립니다.
+    """
+    with span("staleness.summary", rows=len(df)):
+        summary = get_staleness_summary(dataset_key, date.today(), df)
+    days = summary['days']
+
+    min_days = st.number_input(
+        "기준 경과일수 (이 일수 이상 가격이 바뀌지 않은 행)",
+        min_value=0, value=STALE_DAYS_DEFAULT, step=30, key=f"{key}_min_days",
+    )
+    with span("staleness.stale_rows", min_days=min_days):
+        rows = stale_rows(summary, min_days)
+    col_total, col_stale, col_missing = st.columns(3)
+    col_total.metric("전체 행", f"{len(df):,}")
+    col_stale.metric(f"{min_days:,}일 이상", f"{len(rows):,}", f"{len(rows) / max(len(df), 1):.1%}", delta_color="off")
+    col_missing.metric("효력시작일 없음", f"{int(np.isnan(days).sum()):,}")
+
+    tab_buckets, tab_suppliers, tab_oldest, tab_stale = st.tabs(
+        ["구간별 분포", "공급업체별", f"가장 오래된 {OLDEST_N}개", f"{min_days:,}일 이상 전체"]
+    )
+    with tab_buckets:
+        st.plotly_chart(build_bucket_chart(summary['buckets'], "경과일수 구간별 행 수"), use_container_width=True)
+    with tab_suppliers:
+        if summary['suppliers'] is not None:
+            st.dataframe(summary['suppliers'], hide_index=True)
+        else:
+            st.info("공급업체별 집계를 위해 '공급업체' 열이 필요합니다.")
+    with tab_oldest:
+        oldest = summary['order'][:OLDEST_N]
+        st.dataframe(df.iloc[oldest].assign(경과일수=days[oldest]), hide_index=True)
+    with tab_stale:
+        paginated_dataframe(df.iloc[rows].assign(경과일수=days[rows]), key=f"{key}_stale")
+
+
+def render_dataset_changes(dataset_key):
+    """데이터셋이 같은 파일의 이전 버전에서 바뀐 것이면 추가/변경/삭제 요약을 표시하는 함수
+
+    변경된 행은 변경 전/후를 나란히 보여 주며, 종류별로 최대 DELTA_PREVIEW_ROWS행까지 표시합니다.
+    """
+    delta = get_delta(dataset_key)
+    if delta is None:
+        return
+    inserted, updated, deleted = len(delta['inserted']), len(delta['updated_new']), len(delta['deleted'])
+    if not (inserted or updated or deleted):
+        st.info("이전 버전과 내용이 같습니다 (자재코드·공급업체·효력시작일 기준).")
+        return
+    st.info(
+        f"이전 버전 대비 변경 사항 (자재코드·공급업체·효력시작일 기준): "
+        f"추가 {inserted:,}행, 변경 {updated:,}행, 삭제 {deleted:,}행, 그대로 {len(delta['kept_new']):,}행"
+    )
+    with st.expander("변경 내역 보기"):
+        if max(inserted, updated, deleted) > DELTA_PREVIEW_ROWS:
+            st.caption(f"종류별로 처음 {DELTA_PREVIEW_ROWS:,}행까지만 표시합니다.")
+        tab_inserted, tab_updated, tab_deleted, tab_columns = st.tabs(
+            [f"추가 ({inserted:,})", f"변경 ({updated:,})", f"삭제 ({deleted:,})", "열별 변경 수"]
+        )
+        with tab_inserted:
+            st.dataframe(delta['inserted_rows'], hide_index=True)
+        with tab_updated:
+            st.caption("변경 전")
+            st.dataframe(delta['updated_before'], hide_index=True)
+            st.caption("변경 후")
+            st.dataframe(delta['updated_after'], hide_index=True)
+        with tab_deleted:
+            st.dataframe(delta['deleted_rows'], hide_index=True)
+        with tab_columns:
+            counts = pd.Series(delta['changed_columns'], name='변경된 행 수').rename_axis('열')
+            st.dataframe(counts[counts > 0].reset_index(), hide_index=True)
+
+
+def build_price_trend_chart(points, title):
+    """집계된 가격 추이(min/max/mean/last)로 최저~최고 범위 띠와 평균/마지막 가격 선 차트를 만드는 함수"""
+    x = points.index
+    fig = go.Figure([
+        go.Scatter(x=x, y=points['max'], mode='lines', line={'width': 0}, name='최고가', showlegend=False),
+        go.Scatter(
+            x=x, y=points['min'], mode='lines', line={'width': 0}, fill='tonexty',
+            fillcolor='rgba(255, 140, 0, 0.2)', name='최저~최고가',
+        ),
+        go.Scatter(x=x, y=points['mean'], mode='lines', line={'color': 'darkorange'}, name='평균가'),
+        go.Scatter(x=x, y=points['last'], mode='lines', line={'color': 'steelblue', 'dash': 'dot'}, name='마지막 가격'),
+    ])
+    fig.update_layout(
+        title=title,
+        xaxis_title="날짜",
+        yaxis_title="가격(원)",
+        hovermode="x unified",
+        title_font_size=20,
+        margin={'t': 50, 'b': 20},
+    )
+    return fig
@@ -0,0 +1,866 @@
+import difflib
+import logging
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+
+from price_delta import get_delta, old_to_new_positions
+from price_store import get_price_store
+
+logger = logging.getLogger(__name__)
+
+# 데이터셋을 읽을 때 정규화 검색 열을 미리 만들어 두는 열 목록 (날짜 열은 문자열 형태로)
+SEARCH_COLUMNS = ['자재명', '자재코드', '공급업체', '효력시작일']
+
+# 정규화 검색 열을 보관할 데이터셋 수 (초과하면 가장 오래 사용되지 않은 항목부터 제거)
+SEARCH_CACHE_MAX_ENTRIES = 16
+
+# 날짜 범위 검색용 정렬 색인을 만드는 날짜 열
+DATE_COLUMN = '효력시작일'
+
+# 자재코드 일괄 조회용 해시 색인을 만드는 열
+CODE_COLUMN = '자재코드'
+
+# 검색 결과 캐시 상한 (검색 수 / 행 위치 배열의 총 바이트 수, 둘 중 하나라도 넘으면 LRU 제거)
+QUERY_CACHE_MAX_ENTRIES = 1024
+QUERY_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# 전체 열 검색용 n-gram 역색인의 n (3 = 트라이그램)
+NGRAM_SIZE = 3
+
+# 유사 검색(자재명) 설정: 자모 n-gram 크기, 점수를 매길 최대 후보 수,
+# 후보로 남길 최소 n-gram 겹침 비율, 결과로 돌려줄 최소 유사도
+FUZZY_COLUMN = '자재명'
+FUZZY_NGRAM_SIZE = 2
+FUZZY_MAX_CANDIDATES = 200
+FUZZY_MIN_OVERLAP = 0.5
+FUZZY_MIN_SCORE = 0.6
+
+# 유사 검색 비교 키에서 지울 공백/기호
+_FUZZY_STRIP_PATTERN = re.compile(r'[\W_]+')
+
+# 같은 파일의 새 버전 색인을 델타로 갱신할 수 있도록 기억해 두는 색인 종류별 최근 색인 수
+DELTA_BASE_MAX_ENTRIES = 4
+
+# 프로세스 전체(모든 세션)가 공유하는 검색 결과 캐시: (데이터셋 키, 정규화된 검색 조건) -> 행 위치 배열
+_query_cache = OrderedDict()
+_query_cache_bytes = 0
+_query_cache_stats = {'hits': 0, 'misses': 0}
+_query_cache_lock = threading.Lock()
+
+# 델타 갱신의 바탕이 되는 최근 색인: (색인 종류, 데이터셋 키) -> 색인
+_built_indexes = OrderedDict()
+_built_indexes_lock = threading.Lock()
+
+# 메모리 날짜/자재코드 색인을 이미 만든 (색인 종류, 데이터셋 키)와, 백그라운드에서 만드는 중인 것
+# (아직 없으면 가격 저장소의 B-tree 색인으로 조회하고 메모리 색인은 백그라운드에서 만듦)
+_warm_indexes = set()
+_warming_indexes = set()
+_warm_indexes_lock = threading.Lock()
+_index_warmer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="index-warmup")
+
+
+def normalize_text(value):
+    """검색용 문자열 정규화 함수
+
+    NFKC 정규화로 조합형 한글 자모를 완성형 음절로 합치고 전각/반각 문자를
+    통일한 뒤, 대소문자를 접어(casefold) 대소문자 구분 없는 비교가 되도록 합니다.
+    데이터와 검색어 모두 같은 함수를 거치므로 한글/영문 표기가 일관되게 비교됩니다.
+    """
+    return unicodedata.normalize("NFKC", str(value)).casefold()
+
+
+def cached_query_rows(key, compute):
+    """검색 결과 캐시에서 행 위치 배열을 찾고, 없으면 compute()로 계산해 넣는 함수
+
+    ``key``는 데이터셋 키와 정규화된 검색 조건으로 만든 튜플입니다. 캐시에 넣는
+    배열은 읽기 전용으로 바꿔 세션 간에 안전하게 공유합니다.
+    """
+    global _query_cache_bytes
+    with _query_cache_lock:
+        rows = _query_cache.get(key)
+        if rows is not None:
+            _query_cache.move_to_end(key)
+            _query_cache_stats['hits'] += 1
+            return rows
+        _query_cache_stats['misses'] += 1
+
+    rows = compute()
+    rows.setflags(write=False)
+    with _query_cache_lock:
+        if key not in _query_cache:
+            _query_cache[key] = rows
+            _query_cache_bytes += rows.nbytes
+        while len(_query_cache) > 1 and (
+            len(_query_cache) > QUERY_CACHE_MAX_ENTRIES or _query_cache_bytes > QUERY_CACHE_MAX_BYTES
+        ):
+            _, old_rows = _query_cache.popitem(last=False)
+            _query_cache_bytes -= old_rows.nbytes
+    return rows
+
+
+def query_cache_stats():
+    """검색 결과 캐시의 적중/실패 횟수와 현재 항목 수를 반환하는 함수"""
+    with _query_cache_lock:
+        return dict(_query_cache_stats, entries=len(_query_cache), bytes=_query_cache_bytes)
+
+
+def clear_query_cache():
+    """검색 결과 캐시를 비우는 함수 (통계는 유지, 벤치마크에서 캐시 없이 측정할 때 사용)"""
+    global _query_cache_bytes
+    with _query_cache_lock:
+        _query_cache.clear()
+        _query_cache_bytes = 0
+
+
+def _store_query(query):
+    """가격 저장소에서 색인 검색 query(store)를 실행해 행 위치 배열을 반환하는 함수
+
+    저장소를 쓰지 않거나, 데이터셋이 저장소에 없거나, 색인을 쓸 수 없는 조건이거나,
+    SQLite 오류가 나면 None을 반환하므로 호출한 쪽은 메모리 검색으로 처리합니다.
+    """
+    store = get_price_store()
+    if store is None:
+        return None
+    try:
+        return query(store)
+    except sqlite3.Error:
+        logger.exception("가격 저장소 검색 실패, 메모리에서 검색")
+        return None
+
+
+def _mark_warm(kind, dataset_key):
+    """메모리 색인(kind)을 만들었음을 기록하는 함수 (이후 그 데이터셋 조회는 메모리 색인을 씀)"""
+    with _warm_indexes_lock:
+        _warm_indexes.add((kind, dataset_key))
+
+
+def _warm_up(kind, dataset_key, build):
+    """백그라운드 스레드에서 build()로 메모리 색인을 만드는 함수 (실패해도 다음 조회 때 다시 만듦)"""
+    try:
+        build()
+    except Exception:
+        logger.exception("메모리 색인 미리 만들기 실패: %s %s", kind, dataset_key)
+    finally:
+        with _warm_indexes_lock:
+            _warming_indexes.discard((kind, dataset_key))
+
+
+def _cold_store_query(kind, dataset_key, query, build):
+    """메모리 색인(kind)이 아직 없으면 가격 저장소의 B-tree 색인으로 query(store)를 실행하는 함수
+
+    저장소에서 불러온 직후처럼 메모리 색인을 만들기 전이면 저장소에서 바로 찾고, 메모리
+    색인은 build()로 백그라운드에서 만들어 두어 이후 조회는 더 빠른 메모리 색인을 씁니다.
+    메모리 색인이 이미 있거나 저장소에서 찾을 수 없으면 None을 반환합니다.
+    """
+    with _warm_indexes_lock:
+        if (kind, dataset_key) in _warm_indexes:
+            return None
+    result = _store_query(query)
+    if result is None:
+        return None
+    logger.info("메모리 색인이 없어 가격 저장소 색인으로 조회: %s %s", kind, dataset_key)
+    with _warm_indexes_lock:
+        start = (kind, dataset_key) not in _warming_indexes
+        _warming_indexes.add((kind, dataset_key))
+    if start:
+        _index_warmer.submit(_warm_up, kind, dataset_key, build)
+    return result
+
+
+def _remember_index(kind, dataset_key, index):
+    """새 버전이 델타로 갱신할 수 있도록 방금 만든 색인을 기억해 두는 함수"""
+    with _built_indexes_lock:
+        _built_indexes[(kind, dataset_key)] = index
+        _built_indexes.move_to_end((kind, dataset_key))
+        same_kind = [entry for entry in _built_indexes if entry[0] == kind]
+        for entry in same_kind[:-DELTA_BASE_MAX_ENTRIES]:
+            del _built_indexes[entry]
+
+
+def _previous_index(kind, dataset_key):
+    """데이터셋이 이전 버전의 델타이고 이전 버전 색인이 있으면 (델타, 이전 색인)을, 아니면 (None, None)을 반환하는 함수
+
+    이전 버전 색인은 한 번만 넘겨주고 잊어버립니다 (새 버전 색인이 그 자리를 대신함).
+    """
+    delta = get_delta(dataset_key)
+    if delta is None:
+        return None, None
+    with _built_indexes_lock:
+        previous = _built_indexes.pop((kind, delta['old_key']), None)
+    if previous is None:
+        return None, None
+    return delta, previous
+
+
+def _carry_rows(old_values, changed_values, delta):
+    """그대로인 행은 이전 버전 값을, 다시 처리한 행은 새 값을 새 버전 행 순서로 모은 배열을 반환하는 함수"""
+    rows = len(delta['kept_new']) + len(delta['changed_new'])
+    values = np.empty((rows,) + old_values.shape[1:], dtype=old_values.dtype)
+    values[delta['kept_new']] = old_values[delta['kept_old']]
+    values[delta['changed_new']] = changed_values
+    return values
+
+
+def _carry_strings(old_series, changed_series, delta):
+    """_carry_rows()의 pyarrow 문자열 Series 버전 (파이썬 객체로 바꾸지 않고 Arrow take로 모음)"""
+    positions = np.empty(len(delta['kept_new']) + len(delta['changed_new']), dtype=np.int64)
+    positions[delta['kept_new']] = delta['kept_old']
+    positions[delta['changed_new']] = len(old_series) + np.arange(len(changed_series))
+    combined = pa.chunked_array([pa.array(old_series), pa.array(changed_series)], type=pa.large_string())
+    return pd.Series(combined.take(positions), dtype=pd.StringDtype("pyarrow"))
+
+
+def _date_texts(values):
+    """날짜 배열을 검색용 문자열 목록으로 바꾸는 함수 ('2024-03-01', 자정이 아니면 '2024-03-01 09:30:00')
+
+    값마다 형식이 정해지므로 일부 행만 다시 만들어도(델타 갱신) 전체를 만든 것과 같습니다.
+    """
+    text = np.char.replace(np.datetime_as_string(values.astype('datetime64[s]'), unit='s'), 'T', ' ')
+    return [value.removesuffix(' 00:00:00') for value in text.tolist()]
+
+
+def build_normalized_column(series):
+    """열 하나를 정규화된 문자열 배열(pyarrow 문자열 Series)로 변환하는 함수
+
+    같은 값이 반복되는 열(공급업체 등)은 고유값만 정규화한 뒤 코드로 펼칩니다.
+    날짜 열은 _date_texts()의 문자열 형태로 바꿉니다.
+    빈 값(NaN)은 빈 문자열이 되어 어떤 검색어와도 일치하지 않습니다.
+    """
+    codes, uniques = pd.factorize(series, sort=False)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        texts = _date_texts(np.asarray(uniques, dtype='datetime64[ns]'))
+    else:
+        texts = [normalize_text(value) for value in uniques]
+    lookup = np.array(texts + [""], dtype=object)
+    # factorize는 빈 값을 -1로 돌려주므로 lookup의 마지막 항목("")을 가리키게 됨
+    return pd.Series(lookup[codes], dtype=pd.StringDtype("pyarrow"))
+
+
+def build_search_columns(df, columns=SEARCH_COLUMNS):
+    """데이터셋의 검색 대상 열들을 한 번에 정규화하는 함수 (열 이름 -> 정규화 Series)"""
+    return {col: build_normalized_column(df[col]) for col in columns if col in df.columns}
+
+
+@st.cache_resource(max_entries=SEARCH_CACHE_MAX_ENTRIES, show_spinner=False)
+def get_search_columns(dataset_key, _df):
+    """데이터셋 키별로 정규화 검색 열을 한 번만 만들어 모든 세션이 공유하는 함수
+
+    이전 버전의 델타이면 바뀐 행만 정규화하고 나머지는 이전 버전 값을 옮겨 씁니다.
+    """
+    delta, previous = _previous_index('search_columns', dataset_key)
+    if previous is not None:
+        logger.info("정규화 검색 열 델타 갱신: %s (%d행 다시 처리)", dataset_key, len(delta['changed_new']))
+        changed = build_search_columns(_df.iloc[delta['changed_new']], columns=list(previous))
+        search_columns = {col: _carry_strings(previous[col], changed[col], delta) for col in previous}
+    else:
+        logger.info("정규화 검색 열 생성: %s", dataset_key)
+        search_columns = build_search_columns(_df)
+    _remember_index('search_columns', dataset_key, search_columns)
+    return search_columns
+
+
+def contains_mask(normalized_column, query):
+    """정규화된 열에서 검색어를 포함하는 행의 불리언 마스크를 반환하는 함수
+
+    검색어는 정규식이 아닌 일반 문자열로 취급합니다.
+    """
+    matches = normalized_column.str.contains(normalize_text(query), regex=False)
+    return matches.to_numpy(dtype=bool, na_value=False)
+
+
+def _search_terms(criteria):
+    """{열 이름: 검색어} 조건을 정규화된 (열, 검색어) 튜플로 바꾸는 함수 (빈 검색어 제외)"""
+    return tuple(sorted((col, normalize_text(query)) for col, query in criteria.items() if query))
+
+
+def text_search_state(dataset_key, criteria, match_all, rows):
+    """다음 검색에서 ``previous``로 넘길 검색 상태(dict)를 만드는 함수"""
+    return {
+        'dataset_key': dataset_key,
+        'match_all': match_all,
+        'terms': _search_terms(criteria),
+        'rows': rows,
+    }
+
+
+def narrows_search(previous_terms, terms, match_all):
+    """새 검색 조건의 결과가 항상 이전 검색 결과의 부분집합인지 판단하는 함수
+
+    AND 검색: 이전 조건의 모든 열에 대해 새 검색어가 이전 검색어를 포함하면
+    됩니다 (다른 열의 조건이 새로 추가되는 것은 허용).
+    OR 검색: 새 조건의 열이 모두 이전 조건에 있고, 각 새 검색어가 이전 검색어를
+    포함해야 합니다.
+    """
+    previous = dict(previous_terms)
+    current = dict(terms)
+    if match_all:
+        return all(col in current and old in current[col] for col, old in previous.items())
+    return set(current) <= set(previous) and all(previous[col] in query for col, query in current.items())
+
+
+def terms_mask(search_columns, terms, match_all, size, candidates=None):
+    """정규화 검색 열에서 (열, 검색어) 조건들을 AND/OR로 묶은 불리언 마스크를 반환하는 함수
+
+    ``candidates``(행 위치 배열)를 주면 그 행만 검사한 마스크를, 아니면 ``size``행 전체의
+    마스크를 돌려줍니다. 검색 열에 없는 열의 조건은 무시합니다.
+    """
+    combined_mask = np.full(size if candidates is None else len(candidates), match_all)
+    for col, query in terms:
+        if col not in search_columns:
+            continue
+        column = search_columns[col] if candidates is None else search_columns[col].iloc[candidates]
+        mask = contains_mask(column, query)
+        if match_all:
+            combined_mask &= mask
+        else:
+            combined_mask |= mask
+    return combined_mask
+
+
+def find_rows(df, dataset_key, criteria, match_all=True, previous=None):
+    """{열 이름: 검색어} 조건에 맞는 행의 위치(정수 배열)를 반환하는 함수
+
+    ``match_all``이 True이면 모든 조건을 만족하는 행(AND), False이면 하나라도
+    만족하는 행(OR)을 찾습니다. 검색어가 비어 있거나 데이터셋에 없는 열의 조건은
+    무시합니다.
+
+    ``previous``에 직전 검색 상태(``text_search_state``)를 넘기면, 새 조건이 직전
+    조건을 좁히는 경우(검색어가 길어지거나 AND 조건이 추가된 경우) 전체 데이터 대신
+    직전 결과 행만 다시 검사합니다. 그렇지 않고 데이터셋이 가격 저장소에 있으면
+    FTS 색인으로 찾고, 색인을 쓸 수 없는 조건(짧은 검색어뿐인 경우 등)만 전체를 훑습니다.
+    """
+    terms = _search_terms(criteria)
+
+    def compute():
+        candidates = None
+        if (
+            previous is not None
+            and previous['dataset_key'] == dataset_key
+            and previous['match_all'] == match_all
+            and narrows_search(previous['terms'], terms, match_all)
+        ):
+            candidates = previous['rows']
+            logger.info("직전 검색 결과 %d행 안에서 좁혀 검색", len(candidates))
+        else:
+            rows = _store_query(lambda store: store.find_rows(dataset_key, terms, match_all))
+            if rows is not None:
+                return rows
+        search_columns = get_search_columns(dataset_key, df)
+        combined_mask = terms_mask(search_columns, terms, match_all, len(df), candidates)
+        if candidates is None:
+            return np.flatnonzero(combined_mask)
+        return candidates[combined_mask]
+
+    return cached_query_rows((dataset_key, 'text', match_all, terms), compute)
+
+
+def build_date_index(series):
+    """날짜 열을 한 번만 파싱해 정렬된 날짜 배열과 행 위치 배열을 만드는 함수
+
+    반환값은 날짜 오름차순으로 정렬된 'dates'와, 같은 순서의 원래 행 위치
+    'positions'를 가진 dict입니다. 빈 날짜(NaT)는 색인에서 제외합니다.
+    날짜로 변환할 수 없는 값이 있으면 pd.to_datetime의 예외가 그대로 전달됩니다.
+    """
+    values = pd.to_datetime(series).to_numpy()
+    positions = np.flatnonzero(~np.isnat(values))
+    order = np.argsort(values[positions], kind='stable')
+    return {'dates': values[positions][order], 'positions': positions[order]}
+
+
+@st.cache_resource(max_entries=SEARCH_CACHE_MAX_ENTRIES, show_spinner=False)
+def get_date_index(dataset_key, _df, column=DATE_COLUMN):
+    """데이터셋 키별로 날짜 정렬 색인을 한 번만 만들어 모든 세션이 공유하는 함수
+
+    이전 버전의 델타이면 그대로인 행의 위치만 새 위치로 바꾸고, 바뀐 행은 이진 탐색으로
+    정렬 위치에 끼워 넣습니다.
+    """
+    delta, previous = _previous_index(('date', column), dataset_key)
+    if previous is not None:
+        logger.info("날짜 색인 델타 갱신: %s (%s, %d행 다시 처리)", dataset_key, column, len(delta['changed_new']))
+        index = update_date_index(previous, _df[column], delta)
+    else:
+        logger.info("날짜 색인 생성: %s (%s)", dataset_key, column)
+        index = build_date_index(_df[column])
+    _remember_index(('date', column), dataset_key, index)
+    _mark_warm(('date', column), dataset_key)
+    return index
+
+
+def update_date_index(index, series, delta):
+    """이전 버전의 날짜 정렬 색인에 델타를 적용한 새 색인을 반환하는 함수 (이전 색인은 바꾸지 않음)"""
+    positions = old_to_new_positions(delta)[index['positions']]
+    kept = positions >= 0
+    dates, positions = index['dates'][kept], positions[kept]
+    changed = delta['changed_new']
+    added = build_date_index(series.iloc[changed])
+    at = np.searchsorted(dates, added['dates'], side='right')
+    return {
+        'dates': np.insert(dates, at, added['dates']),
+        'positions': np.insert(positions, at, changed[added['positions']]),
+    }
+
+
+def date_range_rows(index, start, end):
+    """시작일~종료일(양 끝 포함, 날짜 단위) 범위에 드는 행의 위치를 반환하는 함수
+
+    정렬된 날짜 배열에서 이진 탐색 두 번으로 구간을 찾고 그 구간만 잘라내므로,
+    검색 비용은 전체 행 수가 아니라 결과 행 수에 비례합니다.
+    결과는 원래 행 순서대로 정렬해 돌려줍니다.
+    """
+    dates = index['dates']
+    lo = np.searchsorted(dates, np.datetime64(start, 'D'), side='left')
+    hi = np.searchsorted(dates, np.datetime64(end, 'D') + np.timedelta64(1, 'D'), side='left')
+    if hi <= lo:
+        return np.empty(0, dtype=np.intp)
+    return np.sort(index['positions'][lo:hi])
+
+
+def find_rows_by_date(df, dataset_key, start, end, column=DATE_COLUMN):
+    """날짜 열이 시작일~종료일(양 끝 포함) 범위에 드는 행의 위치를 반환하는 함수 (결과 캐시 사용)
+
+    효력시작일의 메모리 날짜 색인이 아직 없고 데이터셋이 가격 저장소에 있으면 저장소의
+    B-tree 색인으로 찾습니다.
+    """
+    def compute():
+        if column == DATE_COLUMN:
+            rows = _cold_store_query(
+                ('date', column), dataset_key,
+                lambda store: store.find_rows_by_date(dataset_key, start, end),
+                lambda: get_date_index(dataset_key, df, column),
+            )
+            if rows is not None:
+                return rows
+        return date_range_rows(get_date_index(dataset_key, df, column), start, end)
+
+    return cached_query_rows((dataset_key, 'date', column, start, end), compute)
+
+
+def parse_code_list(text):
+    """붙여넣은 자재코드 목록(줄바꿈/쉼표/탭/세미콜론 구분)을 코드 리스트로 바꾸는 함수
+
+    앞뒤 공백과 빈 항목은 버리고, 중복 코드는 처음 나온 순서대로 하나만 남깁니다.
+    """
+    codes = (part.strip() for part in re.split(r'[\r\n,;\t]+', text or ''))
+    return list(dict.fromkeys(code for code in codes if code))
+
+
+def build_code_index(normalized_column):
+    """정규화된 자재코드 열로 일괄 조회용 해시 색인을 만드는 함수
+
+    고유 코드는 pd.Index(해시 테이블)로, 각 행은 고유 코드 번호로 저장합니다.
+    반환값은 'keys'(고유 코드 Index)와 'row_codes'(행별 코드 번호 배열)를 가진 dict입니다.
+    """
+    row_codes, uniques = pd.factorize(normalized_column, sort=False)
+    return {'keys': pd.Index(uniques), 'row_codes': row_codes}
+
+
+@st.cache_resource(max_entries=SEARCH_CACHE_MAX_ENTRIES, show_spinner=False)
+def get_code_index(dataset_key, _df, column=CODE_COLUMN):
+    """데이터셋 키별로 자재코드 해시 색인을 한 번만 만들어 모든 세션이 공유하는 함수"""
+    logger.info("자재코드 색인 생성: %s (%s)", dataset_key, column)
+    index = build_code_index(get_search_columns(dataset_key, _df)[column])
+    _mark_warm(('code', column), dataset_key)
+    return index
+
+
+def lookup_codes(index, codes):
+    """자재코드 목록과 정확히 일치하는 행의 위치와, 일치하는 행이 없는 코드 목록을 반환하는 함수
+
+    모든 코드를 한 번의 해시 조인(get_indexer)으로 찾고, 찾은 코드 번호를 표시한
+    불리언 표로 행을 한꺼번에 골라내므로 코드 수와 관계없이 전체 열을 한 번만 훑습니다.
+    비교는 검색과 같은 정규화(NFKC + 대소문자 무시)를 거칩니다. 행은 원래 순서대로 반환합니다.
+    """
+    keys = index['keys']
+    ids = keys.get_indexer([normalize_text(code) for code in codes])
+    found = ids >= 0
+    is_match = np.zeros(len(keys) + 1, dtype=bool)  # 마지막 칸은 빈 값(-1)용
+    is_match[ids[found]] = True
+    rows = np.flatnonzero(is_match[index['row_codes']])
+    misses = [code for code, hit in zip(codes, found) if not hit]
+    return rows, misses
+
+
+def find_rows_by_codes(df, dataset_key, codes, column=CODE_COLUMN):
+    """자재코드 목록을 일괄 조회해 (일치 행 위치, 찾지 못한 코드 목록)을 반환하는 함수
+
+    자재코드의 메모리 해시 색인이 아직 없고 데이터셋이 가격 저장소에 있으면 저장소의
+    B-tree 색인으로 찾습니다.
+    """
+    if column == CODE_COLUMN:
+        keys = [normalize_text(code) for code in codes]
+        result = _cold_store_query(
+            ('code', column), dataset_key,
+            lambda store: store.find_rows_by_codes(dataset_key, keys),
+            lambda: get_code_index(dataset_key, df, column),
+        )
+        if result is not None:
+            rows, found = result
+            return rows, [code for code, key in zip(codes, keys) if key not in found]
+    return lookup_codes(get_code_index(dataset_key, df, column), codes)
+
+
+def _ngrams(text, n=NGRAM_SIZE):
+    """문자열의 n-gram 집합을 반환하는 함수"""
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def build_ngram_index(df, n=NGRAM_SIZE):
+    """모든 셀 값에 대한 n-gram 역색인을 만드는 함수
+
+    셀 값은 열 구분 없이 정규화된 고유 문자열(어휘)로 모으고, n-gram마다 그 n-gram을
+    포함하는 어휘 번호 배열을 기록합니다. 각 셀은 어휘 번호로 저장하므로
+    (행 수 x 열 수) 정수 행렬 하나로 일치하는 행을 되찾을 수 있습니다.
+    반환값은 'n', 'vocabulary', 'postings', 'cell_codes' 키를 가진 dict입니다.
+    """
+    vocab_ids = {}
+    vocabulary = []
+    cell_codes = np.empty((len(df), len(df.columns)), dtype=np.int32)
+    for j, col in enumerate(df.columns):
+        codes, uniques = pd.factorize(df[col], sort=False)
+        lookup = np.empty(len(uniques) + 1, dtype=np.int32)
+        for k, value in enumerate(uniques):
+            text = normalize_text(value)
+            vocab_id = vocab_ids.get(text)
+            if vocab_id is None:
+                vocab_id = vocab_ids[text] = len(vocabulary)
+                vocabulary.append(text)
+            lookup[k] = vocab_id
+        lookup[-1] = -1  # 빈 값(NaN)은 어떤 어휘와도 연결하지 않음
+        cell_codes[:, j] = lookup[codes]
+
+    postings = defaultdict(list)
+    for vocab_id, text in enumerate(vocabulary):
+        for gram in _ngrams(text, n):
+            postings[gram].append(vocab_id)
+    return {
+        'n': n,
+        'vocabulary': pd.Series(vocabulary, dtype=pd.StringDtype("pyarrow")),
+        'postings': {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()},
+        'cell_codes': cell_codes,
+    }
+
+
+@st.cache_resource(max_entries=SEARCH_CACHE_MAX_ENTRIES, show_spinner="검색 색인을 만드는 중...")
+def get_ngram_index(dataset_key, _df):
+    """데이터셋 키별로 n-gram 역색인을 한 번만 만들어 모든 세션이 공유하는 함수
+
+    이전 버전의 델타이면 바뀐 행의 셀 값만 어휘에 반영합니다.
+    """
+    delta, previous = _previous_index('ngram', dataset_key)
+    if previous is not None:
+        logger.info("n-gram 검색 색인 델타 갱신: %s (%d행 다시 처리)", dataset_key, len(delta['changed_new']))
+        index = update_ngram_index(previous, _df, delta)
+    else:
+        logger.info("n-gram 검색 색인 생성: %s", dataset_key)
+        index = build_ngram_index(_df)
+    _remember_index('ngram', dataset_key, index)
+    return index
+
+
+def update_ngram_index(index, df, delta):
+    """이전 버전의 n-gram 역색인에 델타를 적용한 새 색인을 반환하는 함수 (이전 색인은 바꾸지 않음)
+
+    바뀐 행의 셀 값만 정규화해 기존 어휘에서 찾고, 처음 보는 값만 어휘 끝에 덧붙여
+    그 n-gram을 역색인에 더합니다. 더 이상 어느 셀도 가리키지 않는 어휘는 남지만
+    검색 결과에는 나오지 않습니다.
+    """
+    part = df.iloc[delta['changed_new']]
+    known = pd.Index(index['vocabulary'])
+    added = {}  # 새 어휘 -> 어휘 번호
+    part_codes = np.empty((len(part), len(part.columns)), dtype=np.int32)
+    for j, col in enumerate(part.columns):
+        codes, uniques = pd.factorize(part[col], sort=False)
+        texts = [normalize_text(value) for value in uniques]
+        lookup = np.full(len(uniques) + 1, -1, dtype=np.int32)  # 마지막 칸은 빈 값(NaN)용
+        lookup[:-1] = known.get_indexer(texts)
+        for k in np.flatnonzero(lookup[:-1] < 0):
+            lookup[k] = added.setdefault(texts[k], len(known) + len(added))
+        part_codes[:, j] = lookup[codes]
+
+    postings = defaultdict(list)
+    for text, vocab_id in added.items():
+        for gram in _ngrams(text, index['n']):
+            postings[gram].append(vocab_id)
+    return {
+        'n': index['n'],
+        'vocabulary': pd.concat(
+            [index['vocabulary'], pd.Series(list(added), dtype=pd.StringDtype("pyarrow"))], ignore_index=True
+        ),
+        'postings': _merge_postings(
+            index['postings'], {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        ),
+        'cell_codes': _carry_rows(index['cell_codes'], part_codes, delta),
+    }
+
+
+def ngram_search(index, query):
+    """n-gram 역색인으로 어느 열이든 검색어를 포함하는 행의 위치를 반환하는 함수
+
+    검색어의 n-gram 역색인 목록을 짧은 것부터 교집합해 후보 어휘를 좁힌 뒤,
+    후보에 대해서만 실제 부분 문자열 일치를 확인합니다. 검색어가 n보다 짧으면
+    후보를 좁힐 수 없으므로 어휘 전체를 확인합니다 (그래도 행 단위가 아닌 고유값 단위).
+    """
+    text = normalize_text(query)
+    vocabulary = index['vocabulary']
+    grams = _ngrams(text, index['n'])
+    if grams:
+        postings = [index['postings'].get(gram) for gram in grams]
+        if any(p is None for p in postings):
+            return np.empty(0, dtype=np.intp)
+        postings.sort(key=len)
+        candidates = postings[0]
+        for p in postings[1:]:
+            candidates = np.intersect1d(candidates, p, assume_unique=True)
+            if len(candidates) == 0:
+                return np.empty(0, dtype=np.intp)
+    else:
+        candidates = np.arange(len(vocabulary))
+
+    # 후보 어휘 중 실제로 검색어를 포함하는 것만 남김 (n-gram이 모두 있어도 순서가 다를 수 있음)
+    verified = vocabulary.iloc[candidates].str.contains(text, regex=False).to_numpy(dtype=bool, na_value=False)
+    is_match = np.zeros(len(vocabulary) + 1, dtype=bool)  # 마지막 칸은 빈 값(-1)용
+    is_match[candidates[verified]] = True
+    return np.flatnonzero(is_match[index['cell_codes']].any(axis=1))
+
+
+def find_rows_any_column(df, dataset_key, query):
+    """모든 열을 대상으로 검색어를 포함하는 행의 위치를 반환하는 함수 (n-gram 색인, 결과 캐시 사용)"""
+    return cached_query_rows(
+        (dataset_key, 'any', normalize_text(query)),
+        lambda: ngram_search(get_ngram_index(dataset_key, df), query),
+    )
+
+
+def carry_over_query_cache(delta, df):
+    """이전 버전 데이터셋의 검색 결과 캐시를 델타로 갱신해 새 버전 키로 옮겨 넣는 함수
+
+    그대로인 행은 이전 결과의 행 위치를 새 위치로 바꾸고, 바뀐 행(변경+추가)만 검색
+    조건을 다시 검사합니다. 그래서 새 버전을 올린 직후의 같은 검색도 캐시에서 바로
+    나옵니다. 옮겨 넣은 검색 수를 반환합니다.
+    """
+    old_key, new_key = delta['old_key'], delta['new_key']
+    with _query_cache_lock:
+        entries = [(key, rows) for key, rows in _query_cache.items() if key[0] == old_key]
+    if not entries:
+        return 0
+
+    mapping = old_to_new_positions(delta)
+    changed = delta['changed_new']
+    part = df.iloc[changed]
+    part_columns = {}  # 바뀐 행의 정규화 열 (필요한 열만 한 번씩 만듦)
+
+    def normalized(columns):
+        for col in columns:
+            if col in part.columns and col not in part_columns:
+                part_columns[col] = build_normalized_column(part[col])
+        return part_columns
+
+    def changed_mask(key):
+        kind = key[1]
+        if kind == 'text':
+            _, _, match_all, terms = key
+            columns = normalized([col for col, _ in terms if col in SEARCH_COLUMNS])
+            return terms_mask(columns, terms, match_all, len(part))
+        if kind == 'date':
+            _, _, column, start, end = key
+            dates = pd.to_datetime(part[column]).to_numpy()
+            return (dates >= np.datetime64(start, 'D')) & (dates < np.datetime64(end, 'D') + np.timedelta64(1, 'D'))
+        if kind == 'any':
+            columns = normalized(part.columns)
+            mask = np.zeros(len(part), dtype=bool)
+            for col in part.columns:
+                mask |= contains_mask(columns[col], key[2])
+            return mask
+        return None
+
+    carried = 0
+    for key, rows in entries:
+        mask = changed_mask(key)
+        if mask is None:
+            continue
+        kept = mapping[rows]
+        new_rows = np.sort(np.concatenate([kept[kept >= 0], changed[mask]]))
+        cached_query_rows((new_key,) + key[1:], lambda: new_rows)
+        carried += 1
+    logger.info("검색 결과 캐시 %d건을 새 버전으로 옮김: %s -> %s", carried, old_key, new_key)
+    return carried
+
+
+def fuzzy_key(value):
+    """유사 검색용 비교 키를 만드는 함수
+
+    검색용 정규화(NFKC + casefold) 뒤 공백과 기호를 지우고, 한글 음절을 자모로
+    분해(NFD)합니다. 그래서 '육각볼트'와 '육각 볼트'는 같은 키가 되고, 받침 하나가
+    틀린 오타는 자모 몇 개만 다른 키가 됩니다.
+    """
+    return unicodedata.normalize("NFD", _FUZZY_STRIP_PATTERN.sub("", normalize_text(value)))
+
+
+def _gram_codes(keys, n):
+    """비교 키 목록의 n-gram을 정수로 바꿔 (키 번호 배열, n-gram 정수 배열)로 반환하는 함수
+
+    키를 UTF-32 코드포인트 행렬로 바꾼 뒤 연속한 n개 코드포인트를 21비트씩 이어 붙여
+    n-gram 하나를 정수 하나로 표현합니다. 키마다 같은 n-gram은 한 번만 남깁니다.
+    """
+    points = np.array(keys, dtype=str) if keys else np.empty(0, dtype='U1')
+    width = max(points.dtype.itemsize // 4, 1)
+    if width < n:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    points = points.view(np.uint32).reshape(len(keys), width).astype(np.int64)
+    grams = np.zeros((len(keys), width - n + 1), dtype=np.int64)
+    for offset in range(n):
+        grams = (grams << 21) | points[:, offset:width - n + 1 + offset]
+    # 키 끝을 넘어간 자리(0으로 채워짐)는 -1로 바꿔 행마다 정렬하면 앞쪽에 모임
+    grams[points[:, n - 1:] == 0] = -1
+    grams.sort(axis=1)
+    keep = grams >= 0
+    keep[:, 1:] &= grams[:, 1:] != grams[:, :-1]
+    key_ids = np.broadcast_to(np.arange(len(keys), dtype=np.int64)[:, None], grams.shape)[keep]
+    return key_ids, grams[keep]
+
+
+def _decode_gram(value, n):
+    """_gram_codes()가 만든 n-gram 정수를 다시 문자열로 바꾸는 함수"""
+    return "".join(chr((value >> (21 * (n - 1 - i))) & 0x1FFFFF) for i in range(n))
+
+
+def _gram_postings(key_ids, grams, n):
+    """(키 번호, n-gram 정수) 쌍을 n-gram 문자열 -> 키 번호 배열 역색인으로 묶는 함수"""
+    # (키 번호, n-gram) 쌍을 n-gram 번호로 정렬해 n-gram별 키 번호 배열로 나눔
+    gram_ids, gram_values = pd.factorize(grams)
+    order = np.argsort(gram_ids, kind='stable')
+    bounds = np.cumsum(np.bincount(gram_ids, minlength=len(gram_values)))[:-1]
+    return {
+        _decode_gram(int(gram), n): ids
+        for gram, ids in zip(gram_values, np.split(key_ids[order].astype(np.int32), bounds))
+    }
+
+
+def _merge_postings(postings, added):
+    """역색인 두 개를 합친 새 역색인을 반환하는 함수 (같은 n-gram의 번호 배열은 이어 붙임, 원본은 바꾸지 않음)"""
+    merged = dict(postings)
+    for gram, ids in added.items():
+        merged[gram] = np.concatenate([merged[gram], ids]) if gram in merged else ids
+    return merged
+
+
+def build_fuzzy_index(series, n=FUZZY_NGRAM_SIZE):
+    """자재명 열의 고유값마다 자모 n-gram 역색인을 만드는 함수
+
+    반환값은 'n', 'keys'(고유값별 비교 키 Series), 'postings'(n-gram -> 고유값 번호 배열),
+    'row_codes'(행별 고유값 번호, 빈 값은 -1) 키를 가진 dict입니다.
+    """
+    row_codes, uniques = pd.factorize(series, sort=False)
+    keys = [fuzzy_key(value) for value in uniques]
+    return {
+        'n': n,
+        'keys': pd.Series(keys, dtype=pd.StringDtype("pyarrow")),
+        'postings': _gram_postings(*_gram_codes(keys, n), n),
+        'row_codes': row_codes,
+    }
+
+
+@st.cache_resource(max_entries=SEARCH_CACHE_MAX_ENTRIES, show_spinner="유사 검색 색인을 만드는 중...")
+def get_fuzzy_index(dataset_key, _df, column=FUZZY_COLUMN):
+    """데이터셋 키별로 유사 검색 색인을 한 번만 만들어 모든 세션이 공유하는 함수
+
+    이전 버전의 델타이면 바뀐 행의 자재명만 비교 키로 바꿔 반영합니다.
+    """
+    delta, previous = _previous_index(('fuzzy', column), dataset_key)
+    if previous is not None:
+        logger.info("유사 검색 색인 델타 갱신: %s (%s, %d행 다시 처리)", dataset_key, column, len(delta['changed_new']))
+        index = update_fuzzy_index(previous, _df[column], delta)
+    else:
+        logger.info("유사 검색 색인 생성: %s (%s)", dataset_key, column)
+        index = build_fuzzy_index(_df[column])
+    _remember_index(('fuzzy', column), dataset_key, index)
+    return index
+
+
+def update_fuzzy_index(index, series, delta):
+    """이전 버전의 유사 검색 색인에 델타를 적용한 새 색인을 반환하는 함수 (이전 색인은 바꾸지 않음)
+
+    바뀐 행의 자재명을 비교 키로 바꿔 기존 키에서 찾고, 처음 보는 키만 덧붙여 그 n-gram을
+    역색인에 더합니다. 더 이상 어느 행도 가리키지 않는 키는 남지만 검색 결과에는 나오지 않습니다.
+    """
+    n = index['n']
+    codes, uniques = pd.factorize(series.iloc[delta['changed_new']], sort=False)
+    keys = [fuzzy_key(value) for value in uniques]
+    known = pd.Index(index['keys'])
+    first = np.flatnonzero(~known.duplicated())  # 같은 비교 키는 처음 나온 번호로 찾음
+    found = pd.Index(known[first]).get_indexer(keys)
+    lookup = np.full(len(uniques) + 1, -1, dtype=np.int64)  # 마지막 칸은 빈 값(-1)용
+    added = {}  # 새 비교 키 -> 키 번호
+    for k, (key, position) in enumerate(zip(keys, found)):
+        lookup[k] = first[position] if position >= 0 else added.setdefault(key, len(known) + len(added))
+
+    new_keys = list(added)
+    key_ids, grams = _gram_codes(new_keys, n)
+    return {
+        'n': n,
+        'keys': pd.concat([index['keys'], pd.Series(new_keys, dtype=pd.StringDtype("pyarrow"))], ignore_index=True),
+        'postings': _merge_postings(index['postings'], _gram_postings(key_ids + len(known), grams, n)),
+        'row_codes': _carry_rows(index['row_codes'], lookup[codes], delta),
+    }
+
+
+def fuzzy_search(index, query, max_candidates=FUZZY_MAX_CANDIDATES, min_score=FUZZY_MIN_SCORE):
+    """유사 검색 색인에서 검색어와 비슷한 행의 위치와 유사도를 유사도 높은 순으로 반환하는 함수
+
+    1. 후보 추리기: 검색어 n-gram의 역색인 목록을 이어 붙여 bincount로 고유값마다 겹치는
+       n-gram 수를 세고, FUZZY_MIN_OVERLAP 비율 이상 겹치는 것 중 많이 겹치는
+       ``max_candidates``개만 남깁니다.
+    2. 점수 매기기: 남은 후보만 검색어 n-gram이 포함된 비율과 비교 키 전체의 유사도
+       (difflib)의 평균으로 점수를 매기고 ``min_score`` 이상만 결과로 남깁니다.
+
+    반환값은 (행 위치 배열, 행별 유사도 배열)이며, 같은 유사도끼리는 원래 행 순서입니다.
+    """
+    key = fuzzy_key(query)
+    empty = (np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float64))
+    if not key:
+        return empty
+    keys = index['keys']
+    grams = _ngrams(key, index['n'])
+    if grams:
+        lists = [index['postings'][gram] for gram in grams if gram in index['postings']]
+        if not lists:
+            return empty
+        shared = np.bincount(np.concatenate(lists), minlength=len(keys))
+        min_shared = max(1, int(np.ceil(len(grams) * FUZZY_MIN_OVERLAP)))
+        candidates = np.flatnonzero(shared >= min_shared)
+        if len(candidates) > max_candidates:
+            top = np.argpartition(-shared[candidates], max_candidates - 1)[:max_candidates]
+            candidates = candidates[top]
+        coverage = shared[candidates] / len(grams)
+    else:
+        # 검색어가 n보다 짧으면 (한 글자 자모 등) 비교 키에 포함되는지로 후보를 고름
+        candidates = np.flatnonzero(keys.str.contains(key, regex=False).to_numpy(dtype=bool, na_value=False))
+        candidates = candidates[:max_candidates]
+        coverage = np.ones(len(candidates))
+
+    similarity = np.array([
+        difflib.SequenceMatcher(None, key, keys.iat[name_id], autojunk=False).ratio() for name_id in candidates
+    ])
+    scores = (coverage + similarity) / 2
+    keep = scores >= min_score
+    name_scores = np.zeros(len(keys) + 1)  # 마지막 칸은 빈 값(-1)용
+    name_scores[candidates[keep]] = scores[keep]
+
+    row_scores = name_scores[index['row_codes']]
+    rows = np.flatnonzero(row_scores > 0)
+    order = np.argsort(-row_scores[rows], kind='stable')
+    return rows[order], row_scores[rows[order]]
+
+
+def find_rows_fuzzy(df, dataset_key, query, column=FUZZY_COLUMN):
+    """자재명 유사 검색 결과 (행 위치 배열, 유사도 배열)을 유사도 높은 순으로 반환하는 함수"""
+    return fuzzy_search(get_fuzzy_index(dataset_key, df, column), query)
@@ -1,23 +1,47 @@
 import streamlit as st
-import pandas as pd
 import io
-import plotly.express as px
-from datetime import datetime, timedelta
+
+from dataset_registry import release_session_dataset
+from excel_loader import (
+    clear_background_ingest, load_stored_dataset, load_uploaded_workbooks_in_background, select_stored_dataset,
+)
+from instrumentation import begin_rerun, measured_fragment, render_debug_panel, span
+from price_schema import memory_report
+from price_trends import ROLLUP_FREQUENCIES, get_price_rollups, trend_window
+from search_engine import find_rows_any_column
+from result_views import build_price_trend_chart, paginated_dataframe, render_dataset_changes, render_export_buttons
 
 # 'openpyxl' 및 'plotly' 라이브러리가 설치되어 있어야 XLSX 파일을 처리하고 차트를 생성할 수 있습니다.
 # 설치 명령어: pip install openpyxl plotly-express
 
 # --- XLSX 파일 분석 및 표시 함수 ---
-def display_excel_analysis_result(uploaded_file):
-    """업로드된 XLSX 파일 내용을 읽고 Streamlit에 표시하는 함수"""
+def display_excel_analysis_result(uploaded_files, stored_key=None):
+    """업로드된 XLSX 파일들(또는 가격 저장소에 저장된 가격표)의 모든 시트를 읽고 Streamlit에 표시하는 함수"""
     try:
-        # XLSX 파일 읽기
-        df = pd.read_excel(uploaded_file)
-        st.session_state['df_data'] = df  # 업로드된 파일을 세션 상태에 저장
-        st.success(f"'{uploaded_file.name}' 파일이 성공적으로 업로드되었습니다.")
+        if uploaded_files:
+            # XLSX 파일 읽기 (백그라운드 스레드에서 읽고, 읽는 동안에는 이전 데이터셋을 계속 사용)
+            dataset_key, df, file_names = load_uploaded_workbooks_in_background(uploaded_files)
+        else:
+            # 가격 저장소에 저장된 가격표 (서버를 다시 시작해도 파일을 다시 올리지 않고 조회)
+            dataset_key, df, file_names = load_stored_dataset(stored_key)
+        if df is None:
+            if uploaded_files:
+                st.info("파일을 읽는 중입니다. 다 읽으면 자동으로 표시됩니다.")
+            return
+        if st.session_state.get('dataset_key') != dataset_key:
+            # 다른 데이터셋(새 파일, 같은 파일의 새 버전, 저장된 가격표)으로 바뀌면 이전 검색 결과를 비움
+            st.session_state.pop('search_query', None)
+            st.session_state.pop('search_results_df', None)
+        st.session_state['df_data'] = df  # 데이터셋 키와 함께 새 데이터셋으로 한 번에 전환
+        st.session_state['dataset_key'] = dataset_key
+        loaded = "파일이 성공적으로 업로드되었습니다" if uploaded_files else "파일을 가격 저장소에서 불러왔습니다"
+        st.success(f"'{', '.join(file_names)}' {loaded}.")
+        render_dataset_changes(dataset_key)  # 같은 파일의 새 버전이면 이전 버전 대비 변경 요약
         st.markdown("---")
         st.subheader("업로드된 파일 내용 미리보기")
-        st.dataframe(df)
+        paginated_dataframe(df, key="preview", sort_cache_key=dataset_key)
+        with st.expander("열별 자료형 및 메모리 사용량"):
+            st.dataframe(memory_report(df), hide_index=True)
 
         st.markdown("---")
         st.subheader("분석 요약")
@@ -26,9 +50,110 @@ def display_excel_analysis_result(uploaded_file):
     except Exception as e:
         st.error(f"파일을 처리하는 중 오류가 발생했습니다: {e}")
 
+# --- 조회/검색, 차트 탭 (st.fragment: 탭 안의 위젯을 조작하면 파일 읽기/미리보기 없이 그 탭만 다시 실행) ---
+@measured_fragment
+def search_tab():
+    """파일 내용 조회 및 검색 탭 (검색 버튼을 누르면 이 탭만 다시 실행)"""
+    st.header("업로드된 파일 조회 및 검색")
+
+    if 'df_data' in st.session_state and not st.session_state.df_data.empty:
+        df_to_use = st.session_state.df_data
+
+        # DB 조회 버튼 (페이지를 넘겨도 표가 유지되도록 세션 상태에 표시 여부 저장)
+        if st.button("파일 내용 전체 조회"):
+            st.session_state.show_full_table = True
+        if st.session_state.get('show_full_table'):
+            st.write("업로드된 파일의 전체 내용입니다.")
+            paginated_dataframe(df_to_use, key="full_table", sort_cache_key=st.session_state.dataset_key)
+
+        st.markdown("---")
+        st.header("파일 내용 검색")
+        search_query = st.text_input("상품명, 상품 코드 등으로 검색하세요.", placeholder="예: 노트북")
+
+        # 검색 버튼
+        if st.button("검색"):
+            if search_query:
+                # 모든 열에서 대소문자 구분 없이 검색 (데이터셋별 n-gram 색인 사용)
+                with span("search.any_column"):
+                    rows = find_rows_any_column(df_to_use, st.session_state.dataset_key, search_query)
+                st.session_state.search_results_df = df_to_use.iloc[rows]
+                st.session_state.search_query = search_query
+            else:
+                st.session_state.search_query = ""
+                st.info("검색어를 입력해주세요.")
+
+        # 검색 결과 표시 (페이지 이동 등으로 재실행되어도 마지막 결과 유지)
+        if st.session_state.get('search_query'):
+            filtered_df = st.session_state.search_results_df
+            if not filtered_df.empty:
+                st.success(f"'{st.session_state.search_query}'(으)로 검색된 결과입니다.")
+                paginated_dataframe(filtered_df, key="results")
+                render_export_buttons(filtered_df, key="results")
+            else:
+                st.warning(f"'{st.session_state.search_query}'에 대한 검색 결과가 없습니다.")
+    else:
+        st.info("데이터를 조회하려면 먼저 '엑셀 파일 업로드' 탭에서 파일을 업로드해주세요.")
+
+
+@measured_fragment
+def chart_tab():
+    """가격 변동 차트 탭 (차트 보기 버튼을 누르면 이 탭만 다시 실행)"""
+    st.header("가격 변동 차트")
+    st.write("업로드된 파일의 '가격'과 '날짜' 열을 기준으로 가격 변동 차트를 생성합니다.")
+
+    if 'df_data' in st.session_state and not st.session_state.df_data.empty:
+        df_to_chart = st.session_state.df_data
+
+        # 차트 생성을 위해 필요한 열('날짜', '가격')이 있는지 확인
+        if '날짜' in df_to_chart.columns and '가격' in df_to_chart.columns:
+            # 일별/주별/월별 최저/최고/평균/마지막 가격은 데이터셋마다 한 번만 집계해 둠
+            rollups = get_price_rollups(st.session_state.dataset_key, df_to_chart)
+            daily = rollups['일별']
+            if daily.empty:
+                st.warning("차트로 표시할 날짜/가격 데이터가 없습니다.")
+                return
+            first_day, last_day = daily.index[0].date(), daily.index[-1].date()
+
+            col_range, col_unit = st.columns([2, 1])
+            with col_range:
+                date_range = st.date_input(
+                    "조회 기간", value=(first_day, last_day), min_value=first_day, max_value=last_day,
+                    key=f"trend_range_{st.session_state.dataset_key}",
+                )
+            with col_unit:
+                granularity = st.radio("집계 단위", list(ROLLUP_FREQUENCIES), horizontal=True, key="trend_granularity")
+
+            if st.button("차트 보기"):
+                st.session_state.show_price_trend = True
+
+            if st.session_state.get('show_price_trend'):
+                if len(date_range) != 2:
+                    st.info("조회 기간의 시작일과 종료일을 모두 선택해주세요.")
+                    return
+                date_start, date_end = date_range
+                # 미리 집계한 결과에서 기간만 잘라내고, 점이 많으면 모양을 유지하며 줄임
+                points, period_count = trend_window(rollups[granularity], date_start, date_end)
+
+                if not points.empty:
+                    st.subheader(f"{date_start} ~ {date_end} {granularity} 가격 변동")
+
+                    with span("chart.price_trend", granularity=granularity, points=len(points)):
+                        fig = build_price_trend_chart(points, title='상품 가격 변동 추이')
+                        st.plotly_chart(fig, use_container_width=True)
+                    if len(points) < period_count:
+                        st.caption(f"전체 {period_count:,}개 기간을 모양을 유지하며 {len(points):,}개 점으로 줄여 표시했습니다.")
+                else:
+                    st.warning("선택한 기간에 해당하는 차트 데이터가 없습니다.")
+        else:
+            st.warning("차트를 생성하려면 업로드된 파일에 '날짜'와 '가격' 열이 포함되어 있어야 합니다.")
+    else:
+        st.info("차트를 보려면 먼저 '엑셀 파일 업로드' 탭에서 파일을 업로드해주세요.")
+
+
 # --- 메인 애플리케이션 로직 ---
 def main():
     st.set_page_config(layout="wide")
+    begin_rerun()  # 성능 측정 패널: 이번 재실행의 구간 기록 시작
     st.title("통합 데이터 분석 및 조회 시스템")
     st.markdown("---")
 
@@ -38,79 +163,32 @@ def main():
     # 탭 1: 엑셀 파일 업로드
     with tab1:
         st.header("엑셀 파일 업로드")
-        st.write("분석을 원하는 XLSX 파일을 업로드하세요.")
-        uploaded_file = st.file_uploader("파일 선택", type=["xlsx"])
-        if uploaded_file:
-            display_excel_analysis_result(uploaded_file)
+        st.write("분석을 원하는 XLSX 파일을 업로드하세요. (여러 파일 선택 가능, 모든 시트를 읽습니다)")
+        uploaded_files = st.file_uploader("파일 선택", type=["xlsx"], accept_multiple_files=True)
+        # 파일을 올리지 않았으면 가격 저장소에 저장된 가격표를 고를 수 있음 (저장소를 켠 경우)
+        stored_key = None if uploaded_files else select_stored_dataset()
+        if uploaded_files or stored_key is not None:
+            with span("display_excel_analysis_result", files=len(uploaded_files or [])):
+                display_excel_analysis_result(uploaded_files, stored_key)
         else:
             if 'df_data' in st.session_state:
                 del st.session_state['df_data']
+            if 'dataset_key' in st.session_state:
+                del st.session_state['dataset_key']
+                release_session_dataset()  # 공유 데이터셋 레지스트리에서 이 세션의 참조 해제
+        if not uploaded_files:
+            clear_background_ingest()  # 진행 중인 백그라운드 읽기 취소
 
     # 탭 2: 파일 내용 조회 및 검색
     with tab2:
-        st.header("업로드된 파일 조회 및 검색")
-        
-        if 'df_data' in st.session_state and not st.session_state.df_data.empty:
-            df_to_use = st.session_state.df_data
-
-            # DB 조회 버튼
-            if st.button("파일 내용 전체 조회"):
-                st.write("업로드된 파일의 전체 내용입니다.")
-                st.dataframe(df_to_use)
-
-            st.markdown("---")
-            st.header("파일 내용 검색")
-            search_query = st.text_input("상품명, 상품 코드 등으로 검색하세요.", placeholder="예: 노트북")
-            
-            # 검색 버튼
-            if st.button("검색"):
-                if search_query:
-                    # 모든 열에서 대소문자 구분 없이 검색
-                    filtered_df = df_to_use[
-                        df_to_use.apply(lambda row: row.astype(str).str.contains(search_query, case=False).any(), axis=1)
-                    ]
-                    if not filtered_df.empty:
-                        st.success(f"'{search_query}'(으)로 검색된 결과입니다.")
-                        st.dataframe(filtered_df)
-                    else:
-                        st.warning(f"'{search_query}'에 대한 검색 결과가 없습니다.")
-                else:
-                    st.info("검색어를 입력해주세요.")
-        else:
-            st.info("데이터를 조회하려면 먼저 '엑셀 파일 업로드' 탭에서 파일을 업로드해주세요.")
+        search_tab()
 
     # 탭 3: 가격 변동 차트
     with tab3:
-        st.header("가격 변동 차트")
-        st.write("업로드된 파일의 '가격'과 '날짜' 열을 기준으로 가격 변동 차트를 생성합니다.")
-        
-        if 'df_data' in st.session_state and not st.session_state.df_data.empty:
-            df_to_chart = st.session_state.df_data
-            
-            # 차트 생성을 위해 필요한 열('날짜', '가격')이 있는지 확인
-            if '날짜' in df_to_chart.columns and '가격' in df_to_chart.columns:
-                days_to_show = st.slider("지난 몇 일간의 데이터를 표시할까요?", 1, 30, 7)
-                
-                if st.button("차트 보기"):
-                    # '날짜' 열을 datetime 타입으로 변환
-                    df_to_chart['날짜'] = pd.to_datetime(df_to_chart['날짜'])
-                    
-                    # 슬라이더 값에 따라 데이터 필터링
-                    filtered_chart_df = df_to_chart[df_to_chart['날짜'] >= datetime.now() - timedelta(days=days_to_show)]
-                    
-                    if not filtered_chart_df.empty:
-                        st.subheader(f"지난 {days_to_show}일간의 가격 변동")
-                        
-                        # Plotly를 사용하여 차트 생성
-                        fig = px.line(filtered_chart_df, x='날짜', y='가격', title='상품 가격 변동 추이')
-                        fig.update_layout(xaxis_title="날짜", yaxis_title="가격(원)", hovermode="x unified")
-                        st.plotly_chart(fig, use_container_width=True)
-                    else:
-                        st.warning("선택한 기간에 해당하는 차트 데이터가 없습니다.")
-            else:
-                st.warning("차트를 생성하려면 업로드된 파일에 '날짜'와 '가격' 열이 포함되어 있어야 합니다.")
-        else:
-            st.info("차트를 보려면 먼저 '엑셀 파일 업로드' 탭에서 파일을 업로드해주세요.")
+        chart_tab()
+
+    # 사이드바 하단: 성능 측정 패널 (이번 재실행의 모든 구간이 끝난 뒤 표시)
+    render_debug_panel()
 
 if __name__ == "__main__":
     main()
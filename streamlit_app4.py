@@ -1,10 +1,21 @@
 import streamlit as st
 import pandas as pd
 import io
-import plotly.express as px
-from datetime import datetime, timedelta
 import logging
 
+from current_prices import search_target
+from dataset_registry import release_session_dataset
+from excel_loader import (
+    clear_background_ingest, load_stored_dataset, load_uploaded_workbooks_in_background, select_stored_dataset,
+)
+from instrumentation import begin_rerun, measured_fragment, render_debug_panel, span
+from price_schema import memory_report
+from price_staleness import dataset_elapsed_days
+from search_engine import find_rows, find_rows_fuzzy, text_search_state
+from result_views import (
+    paginated_dataframe, render_dataset_changes, render_elapsed_chart, render_export_buttons, render_staleness_summary,
+)
+
 # 'openpyxl'과 'plotly' 라이브러리가 설치되어 있어야 XLSX 파일을 처리하고 차트를 생성할 수 있습니다.
 # 설치 명령어: pip install openpyxl plotly
 
@@ -12,23 +23,143 @@ import logging
 logging.basicConfig(level=logging.INFO)
 
 # --- XLSX 파일 분석 및 표시 함수 (메인 화면에서 호출) ---
-def display_excel_analysis_result(uploaded_file):
-    """업로드된 XLSX 파일 내용을 읽고 Streamlit에 표시하는 함수"""
+def display_excel_analysis_result(uploaded_files, stored_key=None):
+    """업로드된 XLSX 파일들(또는 가격 저장소에 저장된 가격표)의 모든 시트를 읽고 Streamlit에 표시하는 함수"""
     try:
-        # XLSX 파일 읽기
-        df = pd.read_excel(uploaded_file)
-        st.session_state['df_data'] = df  # 업로드된 파일을 세션 상태에 저장
-        st.success(f"'{uploaded_file.name}' 파일이 성공적으로 업로드되었습니다.")
+        if uploaded_files:
+            # XLSX 파일 읽기 (백그라운드 스레드에서 읽고, 읽는 동안에는 이전 데이터셋을 계속 사용)
+            dataset_key, df, file_names = load_uploaded_workbooks_in_background(uploaded_files, progress_container=st.sidebar)
+        else:
+            # 가격 저장소에 저장된 가격표 (서버를 다시 시작해도 파일을 다시 올리지 않고 조회)
+            dataset_key, df, file_names = load_stored_dataset(stored_key)
+        if df is None:
+            if uploaded_files:
+                st.info("파일을 읽는 중입니다. 다 읽으면 자동으로 표시됩니다.")
+            return
+        if st.session_state.get('dataset_key') != dataset_key:
+            # 다른 데이터셋(새 파일, 같은 파일의 새 버전, 저장된 가격표)으로 바뀌면
+            # 이전 검색 결과의 행 위치가 새 데이터셋과 맞지 않으므로 결과와 차트를 비움
+            st.session_state.search_query = ""
+            st.session_state.search_results_df = pd.DataFrame()
+            st.session_state.show_chart = False
+        st.session_state['df_data'] = df  # 데이터셋 키와 함께 새 데이터셋으로 한 번에 전환
+        st.session_state['dataset_key'] = dataset_key
+        loaded = "파일이 성공적으로 업로드되었습니다" if uploaded_files else "파일을 가격 저장소에서 불러왔습니다"
+        st.success(f"'{', '.join(file_names)}' {loaded}.")
+        render_dataset_changes(dataset_key)  # 같은 파일의 새 버전이면 이전 버전 대비 변경 요약
         st.markdown("---")
         st.subheader("업로드된 파일 내용 미리보기")
-        st.dataframe(df)
+        paginated_dataframe(df, key="preview", sort_cache_key=dataset_key)
+        with st.expander("열별 자료형 및 메모리 사용량"):
+            st.dataframe(memory_report(df), hide_index=True)
+        if '효력시작일' in df.columns:
+            # 데이터셋 전체의 가격 경과 현황 (데이터셋/날짜별로 한 번만 집계해 검색 없이 바로 표시)
+            with st.expander("가격 경과 현황 (전체 데이터)"):
+                render_staleness_summary(df, dataset_key, key="staleness")
         
     except Exception as e:
         st.error(f"파일을 처리하는 중 오류가 발생했습니다: {e}")
 
+# --- 검색/차트 섹션 (st.fragment: 섹션 안의 위젯을 조작하면 파일 읽기/미리보기 없이 그 섹션만 다시 실행) ---
+@measured_fragment
+def chart_section():
+    """검색 결과의 가격 변동 차트 섹션 (차트 위젯을 조작하면 이 섹션만 다시 실행)"""
+    st.header("가격 변동 차트")
+    st.write("검색된 자재의 가격 변동 경과일수를 보여주는 차트를 생성합니다.")
+
+    if st.button("차트 보기"):
+        st.session_state.show_chart = True
+
+    if st.session_state.show_chart and not st.session_state.search_results_df.empty:
+        filtered_df = st.session_state.search_results_df
+
+        if '효력시작일' in filtered_df.columns:
+            try:
+                # 경과일수/라벨은 열 단위로 계산하고, 막대 수는 표시 방식에 따라 제한
+                render_elapsed_chart(
+                    filtered_df,
+                    title=f'"{st.session_state.search_query}" 가격 변경 경과 일수',
+                    key="elapsed_chart",
+                    dataset_days=dataset_elapsed_days(st.session_state.dataset_key, st.session_state.df_data),
+                )
+
+            except Exception as e:
+                st.error(f"차트를 생성하는 중 오류가 발생했습니다: {e}")
+        else:
+            st.warning("차트를 생성하려면 '효력시작일' 열이 포함되어 있어야 합니다.")
+    elif st.session_state.show_chart and st.session_state.search_results_df.empty:
+        st.info("차트를 생성하려면 먼저 검색을 해주세요.")
+
+
+@measured_fragment
+def search_section():
+    """검색과 결과, 차트 섹션 (검색 버튼을 누르면 이 섹션만 다시 실행)"""
+    st.markdown("---")
+    st.header("파일 내용 검색")
+    search_query_input = st.text_input("자재명 또는 자재코드로 검색하세요.", key="search_input")
+    st.checkbox("자재명 유사 검색 (띄어쓰기·오타·대소문자 차이 허용)", key="fuzzy_search")
+    st.checkbox("현재 가격만 검색 (자재코드·공급업체별로 오늘 적용 중인 최신 효력시작일 행만)", key="current_prices_only")
+
+    if st.button("검색"):
+        if 'df_data' in st.session_state and not st.session_state.df_data.empty:
+            # 공유 데이터셋(또는 현재 가격 뷰) 참조 (복사하지 않음)
+            df_to_use, search_key = search_target(
+                st.session_state.df_data, st.session_state.dataset_key, st.session_state.get('current_prices_only', False)
+            )
+            search_query = search_query_input
+
+            if search_query and st.session_state.get('fuzzy_search') and '자재명' in df_to_use.columns:
+                # 자재명 유사 검색: 자모 n-gram 색인으로 후보를 추린 뒤 유사도 높은 순으로 정렬
+                with span("search.fuzzy"):
+                    rows, scores = find_rows_fuzzy(df_to_use, search_key, search_query)
+                st.session_state.text_search_state = None  # 유사 검색 결과는 좁히기 검색에 쓰지 않음
+                st.session_state.search_results_df = df_to_use.iloc[rows].assign(유사도=scores.round(2))
+            elif search_query:
+                # '자재명' 또는 '자재코드' 열에서 검색
+                cols_to_search = []
+                if '자재명' in df_to_use.columns:
+                    cols_to_search.append('자재명')
+                if '자재코드' in df_to_use.columns:
+                    cols_to_search.append('자재코드')
+
+                if cols_to_search:
+                    # 미리 정규화해 둔 검색 열에서 하나라도 일치하는 행 검색 (OR)
+                    criteria = {col: search_query for col in cols_to_search}
+                    # 직전 검색어를 포함하는 더 긴 검색어이면 직전 결과 행만 다시 검사
+                    with span("search.text_or"):
+                        rows = find_rows(
+                            df_to_use, search_key, criteria, match_all=False,
+                            previous=st.session_state.get('text_search_state'),
+                        )
+                    st.session_state.text_search_state = text_search_state(
+                        search_key, criteria, False, rows
+                    )
+
+                    filtered_df = df_to_use.iloc[rows]
+                    st.session_state.search_results_df = filtered_df
+                else:
+                    st.warning("검색을 위해 '자재명' 또는 '자재코드' 열이 필요합니다.")
+                    st.session_state.search_results_df = pd.DataFrame()
+            else:
+                st.session_state.search_results_df = pd.DataFrame()
+                st.info("검색어를 입력해주세요.")
+
+    # 검색 결과 표시
+    if not st.session_state.search_results_df.empty:
+        st.success("검색 결과:")
+        paginated_dataframe(st.session_state.search_results_df, key="results")
+        render_export_buttons(st.session_state.search_results_df, key="results")
+    elif st.session_state.search_query:
+         st.warning(f"'{st.session_state.search_query}'에 대한 검색 결과가 없습니다.")
+
+    st.markdown("---")
+    chart_section()
+
+
 # --- 메인 애플리케이션 로직 ---
 def main():
     st.set_page_config(layout="wide")
+    begin_rerun()  # 성능 측정 패널: 이번 재실행의 구간 기록 시작
     st.title("통합 데이터 분석 및 조회 시스템")
     st.markdown("---")
 
@@ -43,116 +174,36 @@ def main():
     # 사이드바: 파일 업로드
     with st.sidebar:
         st.header("엑셀 파일 업로드")
-        st.write("분석을 원하는 XLSX 파일을 업로드하세요.")
-        uploaded_file = st.file_uploader("파일 선택", type=["xlsx"])
-        if uploaded_file:
-            st.session_state['uploaded_file'] = uploaded_file
+        st.write("분석을 원하는 XLSX 파일을 업로드하세요. (여러 파일 선택 가능, 모든 시트를 읽습니다)")
+        uploaded_files = st.file_uploader("파일 선택", type=["xlsx"], accept_multiple_files=True)
+        stored_key = None
+        if uploaded_files:
+            st.session_state['uploaded_files'] = uploaded_files
         else:
-            if 'uploaded_file' in st.session_state:
-                del st.session_state['uploaded_file']
-            if 'df_data' in st.session_state:
-                del st.session_state['df_data']
+            # 파일을 올리지 않았으면 가격 저장소에 저장된 가격표를 고를 수 있음 (저장소를 켠 경우)
+            stored_key = select_stored_dataset()
+            if 'uploaded_files' in st.session_state:
+                del st.session_state['uploaded_files']
+            if stored_key is None:
+                if 'df_data' in st.session_state:
+                    del st.session_state['df_data']
+                if 'dataset_key' in st.session_state:
+                    del st.session_state['dataset_key']
+                    release_session_dataset()  # 공유 데이터셋 레지스트리에서 이 세션의 참조 해제
+            clear_background_ingest()  # 진행 중인 백그라운드 읽기 취소
     
     # 메인 화면
-    if 'uploaded_file' in st.session_state:
-        # 파일이 업로드되었을 때만 분석 결과를 표시
-        uploaded_file_obj = st.session_state['uploaded_file']
-        display_excel_analysis_result(uploaded_file_obj)
+    if 'uploaded_files' in st.session_state or stored_key is not None:
+        # 파일이 업로드되었거나 저장된 가격표를 골랐을 때만 분석 결과를 표시
+        uploaded_files_obj = st.session_state.get('uploaded_files')
+        with span("display_excel_analysis_result", files=len(uploaded_files_obj or [])):
+            display_excel_analysis_result(uploaded_files_obj, stored_key)
 
-        st.markdown("---")
-        st.header("파일 내용 검색")
-        search_query_input = st.text_input("자재명 또는 자재코드로 검색하세요.", key="search_input")
-        
-        if st.button("검색"):
-            if 'df_data' in st.session_state and not st.session_state.df_data.empty:
-                df_to_use = st.session_state.df_data
-                search_query = search_query_input
-
-                if search_query:
-                    # '자재명' 또는 '자재코드' 열에서 검색
-                    cols_to_search = []
-                    if '자재명' in df_to_use.columns:
-                        cols_to_search.append('자재명')
-                    if '자재코드' in df_to_use.columns:
-                        cols_to_search.append('자재코드')
-
-                    if cols_to_search:
-                        combined_mask = pd.Series([False] * len(df_to_use))
-                        for col in cols_to_search:
-                            col_str = df_to_use[col].astype(str)
-                            combined_mask |= col_str.str.contains(search_query, case=False, na=False)
-                        
-                        filtered_df = df_to_use[combined_mask].copy()
-                        st.session_state.search_results_df = filtered_df
-                    else:
-                        st.warning("검색을 위해 '자재명' 또는 '자재코드' 열이 필요합니다.")
-                        st.session_state.search_results_df = pd.DataFrame()
-                else:
-                    st.session_state.search_results_df = pd.DataFrame()
-                    st.info("검색어를 입력해주세요.")
-            
-        # 검색 결과 표시
-        if not st.session_state.search_results_df.empty:
-            st.success("검색 결과:")
-            st.dataframe(st.session_state.search_results_df)
-        elif st.session_state.search_query:
-             st.warning(f"'{st.session_state.search_query}'에 대한 검색 결과가 없습니다.")
-
-        st.markdown("---")
-        st.header("가격 변동 차트")
-        st.write("검색된 자재의 가격 변동 경과일수를 보여주는 차트를 생성합니다.")
-        
-        if st.button("차트 보기"):
-            st.session_state.show_chart = True
-
-        if st.session_state.show_chart and not st.session_state.search_results_df.empty:
-            filtered_df = st.session_state.search_results_df
-
-            if '효력시작일' in filtered_df.columns:
-                try:
-                    filtered_df['효력시작일'] = pd.to_datetime(filtered_df['효력시작일'])
-                    today = datetime.now()
-                    filtered_df['경과일수'] = (today - filtered_df['효력시작일']).dt.days
-
-                    if not filtered_df.empty:
-                        # 차트 라벨 생성: 자재명(자재코드)(공급업체)
-                        label_cols = ['자재명', '자재코드', '공급업체']
-                        for col in label_cols:
-                            if col not in filtered_df.columns:
-                                filtered_df[col] = '' # 해당 열이 없으면 빈 문자열로 채움
-                        
-                        filtered_df['차트_라벨'] = filtered_df.apply(
-                            lambda row: f"{row['자재명']} ({row['자재코드']}) ({row['공급업체']})", axis=1
-                        )
-                        
-                        fig = px.bar(
-                            filtered_df.sort_values(by='경과일수', ascending=False),
-                            x='경과일수',
-                            y='차트_라벨',
-                            orientation='h',
-                            title=f'"{st.session_state.search_query}" 가격 변경 경과 일수',
-                            labels={'경과일수': '경과 일수', '차트_라벨': '자재 정보'},
-                            text='경과일수',
-                            color_discrete_sequence=['darkorange']
-                        )
-                        fig.update_layout(
-                            yaxis={'autorange': 'reversed'},
-                            title_font_size=20,
-                            margin={'t': 50, 'b': 20},
-                            xaxis_title_font_size=14,
-                            yaxis_title_font_size=14
-                        )
-                        fig.update_traces(texttemplate='%{text} days', textposition='outside')
-                        st.plotly_chart(fig, use_container_width=True)
-                    else:
-                        st.info("차트를 생성할 데이터가 없습니다. 먼저 검색을 해주세요.")
+        # 검색/결과/차트 섹션 (fragment로 분리되어 검색 버튼은 이 섹션만 다시 실행)
+        search_section()
 
-                except Exception as e:
-                    st.error(f"차트를 생성하는 중 오류가 발생했습니다: {e}")
-            else:
-                st.warning("차트를 생성하려면 '효력시작일' 열이 포함되어 있어야 합니다.")
-        elif st.session_state.show_chart and st.session_state.search_results_df.empty:
-            st.info("차트를 생성하려면 먼저 검색을 해주세요.")
+    # 사이드바 하단: 성능 측정 패널 (이번 재실행의 모든 구간이 끝난 뒤 표시)
+    render_debug_panel()
 
 if __name__ == "__main__":
     main()